@@ -0,0 +1,33 @@
+import decimal
+
+import orjson
+from django.utils.encoding import force_str
+from django.utils.functional import Promise
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+_fallback_encoder = JSONEncoder()
+
+
+def orjson_default(obj):
+    """Types orjson does not handle natively, encoded like DRF's JSONEncoder"""
+    if isinstance(obj, decimal.Decimal):
+        return float(obj)
+    if isinstance(obj, Promise):
+        return force_str(obj)
+    return _fallback_encoder.default(obj)
+
+
+def dumps(data):
+    return orjson.dumps(data, default=orjson_default, option=orjson.OPT_UTC_Z)
+
+
+class ORJSONRenderer(JSONRenderer):
+    """JSONRenderer backed by orjson; indented output still goes through the stdlib"""
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        if self.get_indent(accepted_media_type, renderer_context or {}) is not None:
+            return super().render(data, accepted_media_type, renderer_context)
+        return dumps(data)
@@ -0,0 +1,49 @@
+import re
+from itertools import islice
+
+from django.http import StreamingHttpResponse
+from django.utils.text import compress_sequence
+
+from core.renderers import dumps
+
+accepts_gzip = re.compile(r'\bgzip\b')
+
+
+def stream_json_array(items):
+    """Encode an iterable of dicts as one JSON array, one item at a time"""
+    yield b'['
+    for index, item in enumerate(items):
+        yield (b',' if index else b'') + dumps(item)
+    yield b']'
+
+
+def streaming_response(chunks, request, content_type='application/json'):
+    """StreamingHttpResponse, gzip-compressed on the fly if the client accepts it"""
+    if accepts_gzip.search(request.META.get('HTTP_ACCEPT_ENCODING', '')):
+        response = StreamingHttpResponse(compress_sequence(chunks), content_type=content_type)
+        response['Content-Encoding'] = 'gzip'
+    else:
+        response = StreamingHttpResponse(chunks, content_type=content_type)
+    response['Vary'] = 'Accept-Encoding'
+    return response
+
+
+class StreamingListMixin:
+    """
+    Opt-in streaming for list views: with ?stream=1 the queryset is read
+    in chunks through a server-side cursor, serialized one chunk at a time
+    and written out as a JSON array, so peak memory stays at one chunk.
+    """
+    stream_query_param = 'stream'
+    stream_chunk_size = 500
+
+    def list(self, request, *args, **kwargs):
+        if request.query_params.get(self.stream_query_param) not in ('1', 'true'):
+            return super().list(request, *args, **kwargs)
+        queryset = self.filter_queryset(self.get_queryset())
+        return streaming_response(stream_json_array(self.iter_serialized(queryset)), request)
+
+    def iter_serialized(self, queryset):
+        rows = queryset.iterator(chunk_size=self.stream_chunk_size)
+        while chunk := list(islice(rows, self.stream_chunk_size)):
+            yield from self.get_serializer(chunk, many=True).data
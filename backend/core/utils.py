@@ -2,6 +2,7 @@ import ulid
 def custom_id(length=100, prefix=None):
     if prefix:
         uid = ulid.new()
-        uid = uid.str
+        # ulid-rs-py exposes the string form as a method
+        uid = uid.str()
         uid = f"{prefix}-{uid}"
     return uid[:length]
\ No newline at end of file
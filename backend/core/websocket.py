@@ -0,0 +1,44 @@
+from urllib.parse import parse_qs
+
+from channels.db import database_sync_to_async
+from channels.middleware import BaseMiddleware
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken, TokenError
+
+
+def scope_token(scope):
+    """
+    The access token of a websocket handshake: ?token= for browsers, which
+    cannot set headers on a socket, or the usual Authorization header.
+    """
+    token = parse_qs(scope.get('query_string', b'').decode()).get('token')
+    if token:
+        return token[0]
+    for name, value in scope.get('headers', []):
+        if name == b'authorization':
+            parts = value.decode().split()
+            if len(parts) == 2:
+                return parts[1]
+    return None
+
+
+@database_sync_to_async
+def jwt_user(raw_token):
+    authentication = JWTAuthentication()
+    try:
+        return authentication.get_user(authentication.get_validated_token(raw_token))
+    except (InvalidToken, TokenError, AuthenticationFailed):
+        return None
+
+
+class JWTAuthMiddleware(BaseMiddleware):
+    """Set scope['user'] from the same JWT access tokens as the REST API"""
+
+    async def __call__(self, scope, receive, send):
+        raw_token = scope_token(scope)
+        if raw_token:
+            user = await jwt_user(raw_token)
+            if user is not None:
+                scope = dict(scope, user=user)
+        return await super().__call__(scope, receive, send)
@@ -1,11 +1,12 @@
 from rest_framework import generics
 from rest_framework.permissions import IsAuthenticated, IsAuthenticatedOrReadOnly
 from rest_framework_simplejwt.authentication import JWTAuthentication
+from core.streaming import StreamingListMixin
 from .models import GuestUser
 from .serializers import GuestUserSerializer
 
 # Create your views here.
-class GuestUserListView(generics.ListAPIView):
+class GuestUserListView(StreamingListMixin, generics.ListAPIView):
     serializer_class=GuestUserSerializer
     permission_classes=[IsAuthenticatedOrReadOnly]
     authentication_classes=[JWTAuthentication]
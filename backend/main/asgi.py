@@ -1,5 +1,4 @@
 import os
-import chat.routing
 
 from channels.auth import AuthMiddlewareStack
 from channels.routing import ProtocolTypeRouter, URLRouter
@@ -7,9 +6,15 @@ from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'main.settings')
 
+# Load the apps before importing consumers, which import models
+django_asgi_app = get_asgi_application()
+
+import shops.routing  # noqa: E402
+from core.websocket import JWTAuthMiddleware  # noqa: E402
+
 application = ProtocolTypeRouter({
-    "http": get_asgi_application(),
+    "http": django_asgi_app,
     "websocket": AuthMiddlewareStack(
-        URLRouter(chat.routing.websocket_urlpatterns)
+        JWTAuthMiddleware(URLRouter(shops.routing.websocket_urlpatterns))
     )
 })
@@ -1,5 +1,6 @@
 from pathlib import Path
 import os
+import sys
 from datetime import timedelta
 import environ #type:ignore
 import certifi  # type: ignore
@@ -29,12 +30,24 @@ CORS_ALLOWED_ORIGINS = env.list(
 )
 
 
-# CELERY_BEAT_SCHEDULE = {
-#     'clear-expired-discounts': {
-#         'task': 'shops.tasks.clear_expired_discounts',
-#         'schedule': crontab(minute='*/15'),  # Every 15 minutes
-#     },
-# }
+CELERY_BROKER_URL = env('CELERY_BROKER_URL', default='redis://127.0.0.1:6379/2')
+CELERY_TIMEZONE = 'UTC'
+# Discounts are expired by a task scheduled at the next discount_end_at
+# (see shops.discounts); the hourly run only recovers lost wake-ups.
+CELERY_BEAT_SCHEDULE = {
+    'clear-expired-discounts': {
+        'task': 'shops.tasks.clear_expired_discounts',
+        'schedule': crontab(minute=0),
+    },
+    'release-expired-holds': {
+        'task': 'shops.tasks.release_expired_holds',
+        'schedule': crontab(minute='*/5'),
+    },
+    'dispatch-stale-intakes': {
+        'task': 'shops.tasks.dispatch_stale_intakes',
+        'schedule': crontab(),
+    },
+}
 # Application definition
 
 INSTALLED_APPS = [
@@ -44,6 +57,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
     'djoser',
     'corsheaders',
     'rest_framework',
@@ -96,6 +110,23 @@ CHANNEL_LAYERS = {
     },
 }
 
+TESTING = 'test' in sys.argv or 'pytest' in sys.modules
+
+# Cache: Redis (same server as the channel layer) in production, local memory for tests
+if TESTING:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        },
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': env('REDIS_CACHE_URL', default='redis://127.0.0.1:6379/1'),
+        },
+    }
+
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
@@ -141,6 +172,10 @@ REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
         'rest_framework_simplejwt.authentication.JWTAuthentication',
     ),
+    'DEFAULT_RENDERER_CLASSES': (
+        'core.renderers.ORJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ),
 }
 SIMPLE_JWT = {
     "AUTH_HEADER_TYPES": (
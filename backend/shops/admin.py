@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import ProductCategory, ProductProperty, Shop, Product, ProductImage, ProductRating, OrderProduct
+from .models import ProductCategory, ProductProperty, Shop, Product, ProductImage, ProductRating, OrderProduct, StockHold, OrderIntake, OrderEvent
 
 # Register your models here.
 admin.site.register(Shop)
@@ -9,3 +9,6 @@ admin.site.register(ProductRating)
 admin.site.register(OrderProduct)
 admin.site.register(ProductCategory)
 admin.site.register(ProductProperty)
+admin.site.register(StockHold)
+admin.site.register(OrderIntake)
+admin.site.register(OrderEvent)
@@ -0,0 +1,130 @@
+from datetime import datetime, time, timedelta
+
+from django.core.cache import cache
+from django.db import connection
+from django.utils import timezone
+
+from .models import Product, OrderProduct
+
+# Dashboards poll; a minute of staleness is fine and spares the database
+ANALYTICS_TIMEOUT = 60
+ANALYTICS_INTERVALS = ('day', 'week', 'month')
+TOP_PRODUCTS = 10
+FUNNEL = [
+    OrderProduct.PENDING, OrderProduct.PROCESSING, OrderProduct.SHIPPED,
+    OrderProduct.COMPLETED, OrderProduct.CANCELLED,
+]
+
+
+def shop_analytics(shop, start, end, interval='day'):
+    """
+    Dashboard figures for `shop` between the dates `start` and `end`
+    (inclusive), cached per shop and range:
+
+    - series: orders, units and revenue per `interval`, with the running
+      total and the change against the previous period
+    - top_products: best sellers by revenue with their share of revenue
+    - funnel: order lines per status
+    - summary: orders, revenue and average order value
+
+    Revenue counts every line that is not cancelled; lines sharing an
+    order number (one checkout) count as one order.
+    """
+    key = f"analytics:{shop.pk}:{start.isoformat()}:{end.isoformat()}:{interval}"
+    data = cache.get(key)
+    if data is None:
+        data = _query(shop, start, end, interval)
+        cache.set(key, data, ANALYTICS_TIMEOUT)
+    return data
+
+
+def _query(shop, start, end, interval):
+    if interval not in ANALYTICS_INTERVALS:
+        raise ValueError(f"Unknown interval {interval!r}")
+    tz = timezone.get_current_timezone()
+    params = {
+        'shop': shop.pk,
+        'start': timezone.make_aware(datetime.combine(start, time.min), tz),
+        'end': timezone.make_aware(datetime.combine(end + timedelta(days=1), time.min), tz),
+        'interval': interval,
+        'tz': str(tz),
+        'cancelled': OrderProduct.CANCELLED,
+        'top': TOP_PRODUCTS,
+    }
+    sql = f"""
+        WITH lines AS (
+            SELECT product_id, order_status, order_number, quantity, order_total,
+                date_trunc(%(interval)s, order_date AT TIME ZONE %(tz)s) AS period
+            FROM {OrderProduct._meta.db_table}
+            WHERE shop_id = %(shop)s AND order_date >= %(start)s AND order_date < %(end)s
+        ),
+        sold AS (
+            SELECT * FROM lines WHERE order_status <> %(cancelled)s
+        ),
+        series AS (
+            SELECT period,
+                count(DISTINCT order_number) AS orders,
+                sum(quantity) AS units,
+                sum(order_total) AS revenue,
+                sum(sum(order_total)) OVER (ORDER BY period) AS cumulative_revenue,
+                sum(order_total) - lag(sum(order_total)) OVER (ORDER BY period) AS revenue_change
+            FROM sold
+            GROUP BY period
+        ),
+        products AS (
+            SELECT product_id,
+                sum(quantity) AS units,
+                sum(order_total) AS revenue,
+                rank() OVER (ORDER BY sum(order_total) DESC) AS rank,
+                sum(order_total) / nullif(sum(sum(order_total)) OVER (), 0) AS share
+            FROM sold
+            GROUP BY product_id
+        )
+        SELECT json_build_object(
+            'series', (
+                SELECT coalesce(json_agg(json_build_object(
+                    'period', to_char(period, 'YYYY-MM-DD'),
+                    'orders', orders,
+                    'units', units,
+                    'revenue', revenue,
+                    'cumulative_revenue', cumulative_revenue,
+                    'revenue_change', revenue_change
+                ) ORDER BY period), '[]')
+                FROM series
+            ),
+            'top_products', (
+                SELECT coalesce(json_agg(json_build_object(
+                    'product', products.product_id,
+                    'name', p.name,
+                    'rank', products.rank,
+                    'units', products.units,
+                    'revenue', products.revenue,
+                    'share', round(products.share, 4)
+                ) ORDER BY products.rank, p.name), '[]')
+                FROM products
+                JOIN {Product._meta.db_table} p ON p.id = products.product_id
+                WHERE products.rank <= %(top)s
+            ),
+            'funnel', (
+                SELECT coalesce(json_object_agg(order_status, lines), '{{}}')
+                FROM (SELECT order_status, count(*) AS lines FROM lines GROUP BY order_status) AS statuses
+            ),
+            'summary', (
+                SELECT json_build_object(
+                    'orders', count(DISTINCT order_number),
+                    'units', coalesce(sum(quantity), 0),
+                    'revenue', coalesce(sum(order_total), 0),
+                    'average_order_value', round(coalesce(sum(order_total) / nullif(count(DISTINCT order_number), 0), 0), 2)
+                )
+                FROM sold
+            )
+        )
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        data = cursor.fetchone()[0]
+
+    # Every status appears in the funnel, in fulfilment order
+    data['funnel'] = [{'status': status, 'lines': data['funnel'].get(status, 0)} for status in FUNNEL]
+    data['range'] = {'start': start.isoformat(), 'end': end.isoformat(), 'interval': interval}
+    return data
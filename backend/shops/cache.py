@@ -0,0 +1,209 @@
+import uuid
+from urllib.parse import urlencode
+
+from django.core.cache import cache
+from django.db import models, transaction
+from django.utils import timezone
+from django.utils.cache import get_conditional_response
+from django.utils.dateparse import parse_datetime
+from django.utils.http import parse_http_date
+from rest_framework import serializers
+from rest_framework.response import Response
+
+# Serialized fragments are keyed by updated_at, so this only bounds memory
+FRAGMENT_TIMEOUT = 60 * 60 * 6
+
+
+def fragment_key(instance, variant=''):
+    stamp = instance.updated_at.timestamp() if instance.updated_at else ''
+    return f"fragment:{instance._meta.label_lower}:{instance.pk}:{stamp}:{variant}"
+
+
+def touch(queryset):
+    """
+    Bump updated_at on every row of `queryset` with one UPDATE, retiring
+    their cached fragments (and anything else validated by updated_at),
+    and purge the cached responses that contain them.
+    """
+    model_name = queryset.model._meta.model_name
+    pks = list(queryset.values_list('pk', flat=True))
+    if not pks:
+        return 0
+    updated = queryset.model._default_manager.filter(pk__in=pks).update(updated_at=timezone.now())
+    purge_tags(f"{model_name}:{pk}" for pk in pks)
+    return updated
+
+
+class FragmentCacheListSerializer(serializers.ListSerializer):
+    """Serve list items from the fragment cache with one get_many/set_many"""
+
+    def to_representation(self, data):
+        iterable = data.all() if isinstance(data, models.manager.BaseManager) else data
+        instances = list(iterable)
+        variant = self.child.fragment_variant()
+        keys = [fragment_key(instance, variant) for instance in instances]
+        cached = cache.get_many(keys)
+
+        missing = {}
+        representation = []
+        for key, instance in zip(keys, instances):
+            if key not in cached:
+                cached[key] = self.child.to_representation(instance)
+                missing.setdefault(self.child.fragment_timeout(instance), {})[key] = cached[key]
+            representation.append(self.child.add_live_fields(cached[key], instance))
+
+        for timeout, fragments in missing.items():
+            cache.set_many(fragments, timeout)
+        return representation
+
+
+class FragmentCacheMixin:
+    """
+    Cache the serialized dict of each object under its id + updated_at.
+
+    Set Meta.list_serializer_class = FragmentCacheListSerializer so that
+    lists fetch their fragments in bulk. Fields in `live_fields` change
+    without touching updated_at and are serialized on every request.
+    """
+    live_fields = ()
+
+    def fragment_variant(self):
+        # File and image URLs are absolute when a request is available
+        request = self.context.get('request')
+        return request.get_host() if request else ''
+
+    def fragment_timeout(self, instance):
+        return FRAGMENT_TIMEOUT
+
+    def to_representation(self, instance):
+        if isinstance(self.parent, FragmentCacheListSerializer):
+            return super().to_representation(instance)
+
+        key = fragment_key(instance, self.fragment_variant())
+        data = cache.get(key)
+        if data is None:
+            data = super().to_representation(instance)
+            cache.set(key, data, self.fragment_timeout(instance))
+        return self.add_live_fields(data, instance)
+
+    def add_live_fields(self, data, instance):
+        if not self.live_fields:
+            return data
+        data = dict(data)
+        for name in self.live_fields:
+            field = self.fields[name]
+            data[name] = field.to_representation(field.get_attribute(instance))
+        return data
+
+
+# Whole-response cache for public read endpoints. Every entry remembers the
+# version of each tag it depends on ("product:<id>", "shop:<id>", or a
+# collection such as "products"); purging a tag gives it a new version,
+# which turns every entry built against the old one into a miss.
+RESPONSE_TIMEOUT = 60 * 5
+# Validators set by ConditionalGetMixin, kept with the cached data
+RESPONSE_CACHED_HEADERS = ('ETag', 'Last-Modified')
+
+
+def instance_tag(instance):
+    return f"{instance._meta.model_name}:{instance.pk}"
+
+
+def purge_tags(tags):
+    """Give each tag a new version once the current transaction commits"""
+    tags = set(tags)
+    if tags:
+        transaction.on_commit(
+            lambda: cache.set_many({f"tag:{tag}": uuid.uuid4().hex for tag in tags}, timeout=None)
+        )
+
+
+def _tag_versions(tags):
+    keys = {f"tag:{tag}": tag for tag in tags}
+    return {keys[key]: version for key, version in cache.get_many(list(keys)).items()}
+
+
+def _current_tag_versions(tags):
+    """Versions of `tags`, giving the ones never purged a first version"""
+    versions = _tag_versions(tags)
+    missing = [tag for tag in tags if tag not in versions]
+    if missing:
+        # add() keeps a version another worker set in the meantime
+        for tag in missing:
+            cache.add(f"tag:{tag}", uuid.uuid4().hex, timeout=None)
+        versions = _tag_versions(tags)
+    return versions
+
+
+def _response_cache_key(request):
+    query = urlencode(sorted((k, v) for k, values in request.GET.lists() for v in values))
+    return f"response:{request.get_host()}{request.path}?{query}"
+
+
+class ResponseCacheMixin:
+    """
+    Cache the response data of a public list endpoint per path + normalized
+    query string, tagged with the ids it contains.
+
+    cache_collection is the tag purged when rows are added or removed;
+    cache_tag_fields maps tag prefixes to the item field holding the id(s).
+    """
+    cache_collection = None
+    cache_tag_fields = {}
+    cache_expiry_field = None
+    response_cache_timeout = RESPONSE_TIMEOUT
+
+    def _items(self, data):
+        return data.get('results', []) if isinstance(data, dict) else data
+
+    def get_cache_timeout(self, data):
+        """Do not outlive the earliest future `cache_expiry_field` in the page"""
+        timeout = self.response_cache_timeout
+        if self.cache_expiry_field:
+            now = timezone.now()
+            for item in self._items(data):
+                expires_at = parse_datetime(item.get(self.cache_expiry_field) or '')
+                if expires_at and expires_at > now:
+                    timeout = min(timeout, max(1, int((expires_at - now).total_seconds())))
+        return timeout
+
+    def get_cache_tags(self, data):
+        items = self._items(data)
+        tags = {self.cache_collection} if self.cache_collection else set()
+        for item in items:
+            for prefix, field in self.cache_tag_fields.items():
+                values = item.get(field)
+                for value in values if isinstance(values, list) else [values]:
+                    if value is not None:
+                        tags.add(f"{prefix}:{value}")
+        return tags
+
+    def get(self, request, *args, **kwargs):
+        key = _response_cache_key(request)
+        entry = cache.get(key)
+        if entry is not None and _tag_versions(entry['tags']) == entry['tags']:
+            headers = entry.get('headers', {})
+            # A cached page answers conditional requests without querying
+            if 'ETag' in headers:
+                not_modified = get_conditional_response(
+                    request, etag=headers['ETag'], last_modified=parse_http_date(headers['Last-Modified']),
+                )
+                if not_modified is not None:
+                    return not_modified
+            return Response(entry['data'], headers=headers)
+
+        # Versions read before the query: a purge committed while the page
+        # is built leaves the stored entry stale instead of current
+        collection_versions = _current_tag_versions([self.cache_collection] if self.cache_collection else [])
+        response = super().get(request, *args, **kwargs)
+        # Streamed responses have no data to keep
+        if isinstance(response, Response) and response.status_code == 200:
+            versions = _current_tag_versions(self.get_cache_tags(response.data))
+            versions.update(collection_versions)
+            headers = {name: response[name] for name in RESPONSE_CACHED_HEADERS if response.has_header(name)}
+            cache.set(
+                key,
+                {'data': response.data, 'tags': versions, 'headers': headers},
+                self.get_cache_timeout(response.data),
+            )
+        return response
@@ -0,0 +1,76 @@
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.utils import timezone
+
+from .cache import purge_tags
+from .events import order_event, record_order_events
+from .models import Product, OrderProduct, OrderEvent, StockHold
+
+
+def take_stock(product, customer, quantity, now, order_number, note=None):
+    """
+    Decrement the locked `product` in memory and return the unsaved order
+    line, priced at `now`. The caller saves both in bulk.
+    """
+    product.clear_expired_discount(now)
+    unit_price = product.get_current_price(now)
+    product.quantity -= quantity
+    product.updated_at = now
+    return OrderProduct(
+        product=product,
+        shop_id=product.shop_id_id,
+        customer=customer,
+        unit_price=unit_price,
+        quantity=quantity,
+        order_number=order_number,
+        order_total=unit_price * quantity,
+        note=note,
+    )
+
+
+def checkout(customer, items, note=None):
+    """
+    Create one order line per cart item in a single transaction.
+
+    `items` is a list of (product_id, quantity). All product rows are locked
+    in primary key order, so overlapping carts wait on each other instead of
+    deadlocking, and every line is priced against the same clock. Holds the
+    customer placed on these products are converted into the order.
+    """
+    quantities = {}
+    for product_id, quantity in items:
+        quantities[product_id] = quantities.get(product_id, 0) + quantity
+
+    with transaction.atomic():
+        products = list(
+            Product.objects.select_for_update().filter(pk__in=quantities).order_by('pk')
+        )
+        missing = set(quantities) - {product.pk for product in products}
+        if missing:
+            raise ValidationError(f"Unknown products: {', '.join(sorted(missing))}.")
+
+        now = timezone.now()
+        # Stock held by other customers is not for sale
+        held = StockHold.objects.held_quantities(quantities, exclude_customer=customer.pk, now=now)
+        short = [
+            f"Only {max(product.quantity - held.get(product.pk, 0), 0)} of {product.name} in stock."
+            for product in products if product.quantity - held.get(product.pk, 0) < quantities[product.pk]
+        ]
+        if short:
+            raise ValidationError(short)
+
+        order_number = OrderProduct._generate_order_number()
+        lines = [
+            take_stock(product, customer, quantities[product.pk], now, order_number, note)
+            for product in products
+        ]
+
+        # Stock and prices were checked above under the row locks, so the
+        # per-line checks in OrderProduct.save() are not needed here
+        Product.objects.bulk_update(products, ['quantity', 'new_price', 'discount_end_at', 'updated_at'])
+        OrderProduct.objects.bulk_create(lines)
+        record_order_events(order_event(line, OrderEvent.CREATED) for line in lines)
+        # The customer's holds on these products became the order
+        StockHold.objects.filter(customer=customer, product_id__in=quantities).delete()
+        purge_tags(f"product:{product.pk}" for product in products)
+    return lines
@@ -0,0 +1,67 @@
+from django.db.models import Count, Max, Q
+from django.utils import timezone
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+
+
+class ConditionalGetMixin:
+    """
+    Answer GET with 304 Not Modified while the client's ETag/Last-Modified
+    still match.
+
+    The validators come from one aggregate query (row count and newest
+    `last_modified_field`) instead of rendering and hashing the body, so
+    an unchanged resource is never serialized. Placed after
+    ResponseCacheMixin, the validators are cached with the response and the
+    aggregate only runs on a cache miss.
+    """
+    last_modified_field = 'updated_at'
+
+    def get_validator_queryset(self):
+        queryset = self.filter_queryset(self.get_queryset())
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        if lookup_url_kwarg in self.kwargs:
+            queryset = queryset.filter(**{self.lookup_field: self.kwargs[lookup_url_kwarg]})
+        return queryset
+
+    def get_validator_aggregates(self):
+        return {'last_modified': Max(self.last_modified_field)}
+
+    def get_validators(self):
+        aggregates = self.get_validator_queryset().order_by().aggregate(
+            count=Count('pk'), **self.get_validator_aggregates(),
+        )
+        count = aggregates.pop('count')
+        timestamps = [value for value in aggregates.values() if value is not None]
+        if not timestamps:
+            return None, None
+        last_modified = max(timestamps)
+        etag = quote_etag(f"{count}-{last_modified.timestamp()}")
+        return f"W/{etag}", last_modified
+
+    def get(self, request, *args, **kwargs):
+        etag, last_modified = self.get_validators()
+        if last_modified is None:
+            return super().get(request, *args, **kwargs)
+
+        not_modified = get_conditional_response(request, etag=etag, last_modified=int(last_modified.timestamp()))
+        if not_modified is not None:
+            return not_modified
+
+        response = super().get(request, *args, **kwargs)
+        if response.status_code == 200:
+            response['ETag'] = etag
+            response['Last-Modified'] = http_date(last_modified.timestamp())
+        return response
+
+
+class ProductConditionalGetMixin(ConditionalGetMixin):
+    def get_validator_aggregates(self):
+        # A discount that ran out changes the rendered price without
+        # touching updated_at, so its end time counts as a modification
+        aggregates = super().get_validator_aggregates()
+        aggregates['discount_expired_at'] = Max(
+            'discount_end_at',
+            filter=Q(new_price__gt=0, discount_end_at__lte=timezone.now()),
+        )
+        return aggregates
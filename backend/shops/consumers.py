@@ -0,0 +1,62 @@
+from channels.db import database_sync_to_async
+from channels.generic.websocket import AsyncJsonWebsocketConsumer
+
+from .events import order_events_group
+from .intake import intake_group, intake_result
+from .models import OrderIntake, Shop
+
+
+class OrderIntakeConsumer(AsyncJsonWebsocketConsumer):
+    """Sends the result of a queued order request once a worker processed it"""
+
+    async def connect(self):
+        self.token = self.scope['url_route']['kwargs']['token']
+        self.group_name = intake_group(self.token)
+        await self.channel_layer.group_add(self.group_name, self.channel_name)
+        await self.accept()
+
+        # The request may have been processed before the socket connected
+        result = await self.get_result()
+        if result and result['status'] != OrderIntake.PENDING:
+            await self.send_json(result)
+
+    async def disconnect(self, code):
+        await self.channel_layer.group_discard(self.group_name, self.channel_name)
+
+    async def intake_result(self, event):
+        await self.send_json(event['result'])
+
+    @database_sync_to_async
+    def get_result(self):
+        intake = OrderIntake.objects.filter(pk=self.token).first()
+        return intake_result(intake) if intake else None
+
+
+class OrderEventConsumer(AsyncJsonWebsocketConsumer):
+    """
+    Pushes the order events of the connected user's shop as they commit.
+    Clients authenticate with their JWT access token, see core.websocket.
+    """
+
+    async def connect(self):
+        shop_id = await self.get_shop_id()
+        if shop_id is None:
+            await self.close()
+            return
+        self.group_name = order_events_group(shop_id)
+        await self.channel_layer.group_add(self.group_name, self.channel_name)
+        await self.accept()
+
+    async def disconnect(self, code):
+        if hasattr(self, 'group_name'):
+            await self.channel_layer.group_discard(self.group_name, self.channel_name)
+
+    async def order_event(self, event):
+        await self.send_json(event['event'])
+
+    @database_sync_to_async
+    def get_shop_id(self):
+        user = self.scope.get('user')
+        if user is None or not user.is_authenticated:
+            return None
+        return Shop.objects.filter(shop_account=user).values_list('pk', flat=True).first()
@@ -0,0 +1,115 @@
+from datetime import timedelta
+
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.utils import timezone
+
+from .cache import purge_tags
+from .models import Product
+
+# Rows expired per UPDATE; each batch is its own short transaction
+EXPIRY_BATCH_SIZE = 500
+METRICS_CACHE_KEY = 'discounts:expiry-metrics'
+SCHEDULE_CACHE_KEY = 'discounts:next-run'
+# The Redis broker redelivers tasks not acked within its visibility timeout
+# (1 hour), so a far-off ETA would run many times; wake up before that and
+# schedule again
+MAX_EXPIRY_DELAY = timedelta(minutes=50)
+
+
+def active_discounts():
+    """Products with a pending discount, served by the partial index"""
+    return Product.objects.filter(new_price__gt=0, discount_end_at__isnull=False)
+
+
+def next_expiry():
+    return active_discounts().order_by('discount_end_at').values_list('discount_end_at', flat=True).first()
+
+
+def expire_batch(now, batch_size=EXPIRY_BATCH_SIZE):
+    """
+    Clear up to `batch_size` discounts that ended by `now` with one UPDATE.
+    Rows locked by a concurrent writer are skipped and picked up next run.
+    Returns the expired ids with their scheduled end.
+    """
+    table = Product._meta.db_table
+    sql = f"""
+        WITH due AS (
+            SELECT id, discount_end_at FROM {table}
+            WHERE new_price > 0 AND discount_end_at IS NOT NULL AND discount_end_at <= %s
+            ORDER BY discount_end_at
+            LIMIT %s
+            FOR UPDATE SKIP LOCKED
+        )
+        UPDATE {table} AS p SET new_price = 0, discount_end_at = NULL, updated_at = %s
+        FROM due WHERE p.id = due.id
+        RETURNING p.id, due.discount_end_at
+    """
+    with transaction.atomic():
+        with connection.cursor() as cursor:
+            cursor.execute(sql, [now, batch_size, now])
+            rows = cursor.fetchall()
+        # Expiring changes the price shown in fragments and cached lists, and
+        # which products the price filters match
+        if rows:
+            purge_tags([*(f"product:{pk}" for pk, _ in rows), 'products'])
+    return rows
+
+
+def expire_discounts(batch_size=EXPIRY_BATCH_SIZE):
+    """
+    Expire every discount that is due, batch by batch, and record how late
+    the expiry ran compared to discount_end_at.
+    """
+    started_at = timezone.now()
+    expired = 0
+    max_lag = total_lag = 0.0
+    while True:
+        rows = expire_batch(timezone.now(), batch_size)
+        for _, ended_at in rows:
+            lag = (started_at - ended_at).total_seconds()
+            max_lag = max(max_lag, lag)
+            total_lag += lag
+        expired += len(rows)
+        if len(rows) < batch_size:
+            break
+
+    upcoming = next_expiry()
+    previous = cache.get(METRICS_CACHE_KEY) or {}
+    metrics = {
+        'last_run_at': started_at.isoformat(),
+        'expired': expired,
+        'expired_total': previous.get('expired_total', 0) + expired,
+        'max_lag_seconds': round(max_lag, 3),
+        'avg_lag_seconds': round(total_lag / expired, 3) if expired else 0,
+        'next_expiry_at': upcoming.isoformat() if upcoming else None,
+    }
+    cache.set(METRICS_CACHE_KEY, metrics, timeout=None)
+    return expired, upcoming
+
+
+def expiry_metrics():
+    return cache.get(METRICS_CACHE_KEY) or {}
+
+
+def schedule_expiry(eta):
+    """
+    Make sure the expiry task wakes up no later than `eta`, or within
+    MAX_EXPIRY_DELAY. A run that is already queued for an earlier time
+    covers this one.
+    """
+    if eta is None:
+        return
+    wake_at = min(eta, timezone.now() + MAX_EXPIRY_DELAY)
+    scheduled = cache.get(SCHEDULE_CACHE_KEY)
+    if scheduled and timezone.now() <= scheduled <= wake_at:
+        return
+
+    from .tasks import clear_expired_discounts
+
+    def enqueue():
+        # Only once committed, so a rollback leaves no run recorded
+        cache.set(SCHEDULE_CACHE_KEY, wake_at, timeout=None)
+        clear_expired_discounts.apply_async(eta=wake_at)
+
+    transaction.on_commit(enqueue, robust=True)
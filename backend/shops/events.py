@@ -0,0 +1,97 @@
+import json
+
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.db.models import Q, Subquery
+from django.db.models.expressions import RawSQL
+
+from .models import OrderEvent
+
+FEED_LIMIT = 100
+MAX_FEED_LIMIT = 1000
+
+
+def order_events_group(shop_id):
+    return f"order-events.{shop_id}"
+
+
+def order_event(order, event_type):
+    """An unsaved event for `order`; status changes read order._previous_status"""
+    from_status = getattr(order, '_previous_status', None) if event_type == OrderEvent.STATUS_CHANGED else None
+    return OrderEvent(
+        shop_id=order.shop_id,
+        order_id=order.pk,
+        event_type=event_type,
+        from_status=from_status,
+        to_status=None if event_type == OrderEvent.DELETED else order.order_status,
+        payload={
+            'order_number': order.order_number,
+            'product': order.product_id,
+            'customer': order.customer_id,
+            'quantity': order.quantity,
+            'unit_price': order.unit_price,
+            'order_total': order.order_total,
+            'order_status': order.order_status,
+            'order_date': order.order_date,
+        },
+    )
+
+
+def record_order_events(events):
+    """
+    Insert `events` in the current transaction and publish them to the
+    shop's channel group once it commits.
+    """
+    events = OrderEvent.objects.bulk_create(list(events))
+    if events:
+        transaction.on_commit(lambda: publish(events), robust=True)
+    return events
+
+
+def event_data(event):
+    # Round-trip through JSON so the payload holds plain values, as it does
+    # once read back from the database
+    return {
+        'id': event.id,
+        'order': event.order_id,
+        'event_type': event.event_type,
+        'from_status': event.from_status,
+        'to_status': event.to_status,
+        'payload': json.loads(json.dumps(event.payload, cls=DjangoJSONEncoder)),
+        'created_at': event.created_at,
+    }
+
+
+def publish(events):
+    channel_layer = get_channel_layer()
+    if channel_layer is None:
+        return
+    for event in events:
+        data = event_data(event)
+        data['created_at'] = data['created_at'].isoformat()
+        async_to_sync(channel_layer.group_send)(order_events_group(event.shop_id), {
+            'type': 'order.event',
+            'event': data,
+        })
+
+
+def order_feed(shop, after=0, limit=FEED_LIMIT):
+    """
+    Events of `shop` after the event `after`, in commit order.
+
+    Ids are handed out before commit, so ordering by id alone could serve
+    an id while a lower one is still uncommitted. The feed is ordered by
+    the writing transaction instead and only serves transactions older
+    than every one still in flight, so nothing can commit before an event
+    already served.
+    """
+    limit = max(1, min(limit, MAX_FEED_LIMIT))
+    events = OrderEvent.objects.filter(
+        shop=shop, xact_id__lt=RawSQL('pg_snapshot_xmin(pg_current_snapshot())::text::bigint', []),
+    )
+    if after:
+        after_xact = Subquery(OrderEvent.objects.filter(pk=after).values('xact_id'))
+        events = events.filter(Q(xact_id__gt=after_xact) | Q(xact_id=after_xact, id__gt=after))
+    return list(events.order_by('xact_id', 'id')[:limit])
@@ -0,0 +1,73 @@
+import csv
+import json
+from decimal import Decimal
+
+from django.contrib.postgres.expressions import ArraySubquery
+from django.db.models import OuterRef
+
+from core.renderers import dumps
+from .models import Product, ProductCategory, ProductImage
+
+EXPORT_FORMATS = ('csv', 'ndjson')
+EXPORT_CHUNK_SIZE = 2000
+EXPORT_FIELDS = (
+    'id', 'name', 'description', 'quantity', 'price', 'new_price', 'discount_end_at',
+    'currency_unit', 'condition', 'warranty', 'delivery_term', 'refund', 'refund_policy',
+    'properties', 'categories', 'primary_image', 'images', 'created_at', 'updated_at',
+)
+
+
+def export_rows(shop, media_url):
+    """
+    Yield one plain dict per product of `shop`, read through a server-side
+    cursor. Category names and image paths are aggregated in SQL, so no
+    per-product queries or serializers are involved.
+    """
+    categories = ProductCategory.objects.filter(products=OuterRef('pk')).order_by('name').values('name')
+    images = ProductImage.objects.filter(
+        product_id=OuterRef('pk'),
+    ).order_by('-is_primary', 'order', 'updated_at', 'created_at').values('media')
+
+    rows = Product.objects.filter(shop_id=shop).order_by('created_at', 'id').annotate(
+        categories=ArraySubquery(categories),
+        images=ArraySubquery(images),
+    ).values(*(field for field in EXPORT_FIELDS if field != 'primary_image'))
+
+    for row in rows.iterator(chunk_size=EXPORT_CHUNK_SIZE):
+        row['images'] = [media_url(name) for name in row['images'] if name]
+        row['primary_image'] = row['images'][0] if row['images'] else None
+        for field, value in row.items():
+            if isinstance(value, Decimal):
+                row[field] = str(value)
+            elif hasattr(value, 'isoformat'):
+                row[field] = value.isoformat()
+        yield row
+
+
+def ndjson_lines(rows):
+    for row in rows:
+        yield dumps(row) + b'\n'
+
+
+class _Echo:
+    """File-like object whose write() hands the line back to csv.writer"""
+
+    def write(self, value):
+        return value
+
+
+def csv_lines(rows):
+    # Same cell conventions as the importer: "|"-separated lists, JSON properties
+    writer = csv.writer(_Echo())
+    yield writer.writerow(EXPORT_FIELDS).encode()
+    for row in rows:
+        row['categories'] = '|'.join(row['categories'])
+        row['images'] = '|'.join(row['images'])
+        row['properties'] = json.dumps(row['properties'])
+        yield writer.writerow([row[field] for field in EXPORT_FIELDS]).encode()
+
+
+def export_products(shop, fmt, media_url):
+    """Encoded lines (bytes) of the export of `shop` in `fmt`"""
+    rows = export_rows(shop, media_url)
+    return csv_lines(rows) if fmt == 'csv' else ndjson_lines(rows)
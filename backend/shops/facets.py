@@ -0,0 +1,70 @@
+from django.db import connection
+from django.utils import timezone
+
+# Upper bounds of the price facet buckets; the last bucket is open-ended
+PRICE_BUCKETS = [10, 25, 50, 100, 250, 500, 1000]
+
+
+def product_facets(queryset):
+    """
+    Count the products in `queryset` per category, condition, refund flag,
+    price bucket and property value in a single grouped query.
+    """
+    model = queryset.model
+    category_field = model._meta.get_field('category')
+    through = category_field.remote_field.through._meta
+    product_column = through.get_field(category_field.m2m_field_name()).column
+    category_column = through.get_field(category_field.m2m_reverse_field_name()).column
+
+    ids_sql, ids_params = queryset.order_by().values('pk').query.sql_with_params()
+    sql = f"""
+        WITH base AS (
+            SELECT p.id, p.condition, p.refund, p.properties,
+                CASE WHEN p.new_price > 0 AND p.discount_end_at > %s
+                    THEN p.new_price ELSE p.price END AS effective_price
+            FROM {model._meta.db_table} p
+            WHERE p.id IN ({ids_sql})
+        )
+        SELECT 'category', c.id, c.name, count(*)
+        FROM base
+        JOIN {through.db_table} pc ON pc.{product_column} = base.id
+        JOIN {category_field.related_model._meta.db_table} c ON c.id = pc.{category_column}
+        GROUP BY c.id, c.name
+        UNION ALL
+        SELECT 'condition', coalesce(condition, ''), NULL, count(*) FROM base GROUP BY condition
+        UNION ALL
+        SELECT 'refund', refund::text, NULL, count(*) FROM base GROUP BY refund
+        UNION ALL
+        SELECT 'price', width_bucket(effective_price, %s::numeric[])::text, NULL, count(*)
+        FROM base GROUP BY 2
+        UNION ALL
+        SELECT 'property', prop ->> 'name', prop ->> 'value', count(DISTINCT base.id)
+        FROM base, unnest(base.properties) AS prop
+        WHERE prop ->> 'name' IS NOT NULL
+        GROUP BY 2, 3
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(sql, [timezone.now(), *ids_params, PRICE_BUCKETS])
+        rows = cursor.fetchall()
+
+    facets = {'category': [], 'condition': [], 'refund': [], 'price': [], 'properties': []}
+    for facet, value, label, total in rows:
+        if facet == 'category':
+            facets['category'].append({'id': value, 'name': label, 'count': total})
+        elif facet == 'condition':
+            facets['condition'].append({'value': value or None, 'count': total})
+        elif facet == 'refund':
+            facets['refund'].append({'value': value == 'true', 'count': total})
+        elif facet == 'price':
+            bucket = int(value)
+            facets['price'].append({
+                'min': PRICE_BUCKETS[bucket - 1] if bucket > 0 else 0,
+                'max': PRICE_BUCKETS[bucket] if bucket < len(PRICE_BUCKETS) else None,
+                'count': total,
+            })
+        else:
+            facets['properties'].append({'name': value, 'value': label, 'count': total})
+
+    facets['category'].sort(key=lambda f: f['name'])
+    facets['price'].sort(key=lambda f: f['min'])
+    return facets
@@ -0,0 +1,155 @@
+from datetime import datetime, time, timedelta
+from decimal import Decimal, InvalidOperation
+
+from django.db.models import Q
+from django.db.models.functions import Now
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+
+from .models import Product
+from .search import search_products
+
+# Accepted values of ?ordering= and the columns they sort on; the primary
+# key keeps the order stable for keyset pagination
+PRODUCT_ORDERINGS = {
+    'price': ('sale_price', 'id'),
+    '-price': ('-sale_price', '-id'),
+}
+ORDER_ORDERINGS = {
+    'order_date': ('order_date', 'id'),
+    '-order_date': ('-order_date', '-id'),
+}
+
+
+def _param_list(params, name):
+    """Accept both ?name=a&name=b and ?name=a,b"""
+    values = []
+    for value in params.getlist(name):
+        values.extend(v.strip() for v in value.split(',') if v.strip())
+    return values
+
+
+def _param_decimal(params, name):
+    try:
+        return Decimal(params[name])
+    except (KeyError, InvalidOperation):
+        return None
+
+
+def _param_datetime(params, name):
+    """
+    Parse a datetime or a date; returns (moment, is_date) with a date taken
+    as the start of that local day.
+    """
+    value = params.get(name, '').strip()
+    try:
+        day = parse_date(value)
+        if day is not None:
+            moment, is_date = datetime.combine(day, time.min), True
+        else:
+            moment, is_date = parse_datetime(value), False
+    except ValueError:
+        return None, False
+    if moment is None:
+        return None, False
+    if timezone.is_naive(moment):
+        moment = timezone.make_aware(moment)
+    return moment, is_date
+
+
+def _price_range(min_price, max_price):
+    """
+    Products whose current price is within the bounds. sale_price still
+    holds the discounted price of a discount that ended but was not cleared
+    yet, so those few rows, found through the partial discount index, are
+    matched on their regular price like the facets and the shown price.
+    """
+    def within(field):
+        bounds = {}
+        if min_price is not None:
+            bounds[f'{field}__gte'] = min_price
+        if max_price is not None:
+            bounds[f'{field}__lte'] = max_price
+        return Q(**bounds)
+
+    ended = Q(new_price__gt=0, discount_end_at__isnull=False, discount_end_at__lte=Now())
+    return (within('sale_price') & ~ended) | (ended & within('price'))
+
+
+def filter_products(queryset, params):
+    """
+    Apply the storefront filters shared by the product list, search and
+    facet endpoints.
+
+    Supported params: keyword, category, shop, condition, refund,
+    property (as "Name:value"), min_price/max_price (the effective price,
+    discounts included) and ordering (price or -price).
+    """
+    keyword = params.get('keyword', '').strip()
+    if keyword:
+        queryset = search_products(queryset, keyword)
+
+    categories = _param_list(params, 'category')
+    if categories:
+        # Filter through the join table so products in several of the
+        # requested categories are not returned twice
+        in_categories = Product.category.through.objects.filter(productcategory_id__in=categories)
+        queryset = queryset.filter(pk__in=in_categories.values('product_id'))
+
+    shops = _param_list(params, 'shop')
+    if shops:
+        queryset = queryset.filter(shop_id__in=shops)
+
+    conditions = _param_list(params, 'condition')
+    if conditions:
+        queryset = queryset.filter(condition__in=conditions)
+
+    refund = params.get('refund')
+    if refund in ('true', 'false'):
+        queryset = queryset.filter(refund=refund == 'true')
+
+    for prop in params.getlist('property'):
+        name, _, value = prop.partition(':')
+        if name and value:
+            queryset = queryset.filter(properties__contains=[{'name': name, 'value': value}])
+
+    min_price = _param_decimal(params, 'min_price')
+    max_price = _param_decimal(params, 'max_price')
+    ordering = PRODUCT_ORDERINGS.get(params.get('ordering'))
+    if min_price is not None or max_price is not None:
+        queryset = queryset.filter(_price_range(min_price, max_price))
+    if ordering:
+        queryset = queryset.order_by(*ordering)
+
+    return queryset
+
+
+def filter_orders(queryset, params):
+    """
+    Apply the order list filters: order_status, date_from/date_to (dates are
+    whole local days, date_to included), product, customer and ordering
+    (order_date or -order_date).
+    """
+    statuses = _param_list(params, 'order_status')
+    if statuses:
+        queryset = queryset.filter(order_status__in=statuses)
+
+    date_from, _ = _param_datetime(params, 'date_from')
+    if date_from:
+        queryset = queryset.filter(order_date__gte=date_from)
+    date_to, is_date = _param_datetime(params, 'date_to')
+    if date_to and is_date:
+        queryset = queryset.filter(order_date__lt=date_to + timedelta(days=1))
+    elif date_to:
+        queryset = queryset.filter(order_date__lte=date_to)
+
+    products = _param_list(params, 'product')
+    if products:
+        queryset = queryset.filter(product_id__in=products)
+
+    customers = _param_list(params, 'customer')
+    if customers:
+        queryset = queryset.filter(customer_id__in=customers)
+
+    ordering = ORDER_ORDERINGS.get(params.get('ordering'), ORDER_ORDERINGS['-order_date'])
+    return queryset.order_by(*ordering)
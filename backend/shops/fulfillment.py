@@ -0,0 +1,87 @@
+from django.db import connection, transaction
+from django.utils import timezone
+
+from .cache import purge_tags
+from .events import order_event, record_order_events
+from .models import Product, OrderProduct, OrderEvent
+from .sales import record_sales, sales_row
+
+
+def bulk_change_status(queryset, order_ids, status):
+    """
+    Move the orders `order_ids` within `queryset` to `status` and return
+    one result per id, in a bounded number of statements: the guarded
+    status UPDATE, the product locks and one aggregated restock UPDATE for
+    cancellations (or the sales rollup upserts for completions), the order
+    event insert and one read to explain the orders that could not be
+    changed.
+    """
+    order_ids = list(dict.fromkeys(order_ids))
+    table = OrderProduct._meta.db_table
+    scope_sql, scope_params = queryset.filter(pk__in=order_ids).order_by().values('pk').query.sql_with_params()
+    sql = f"""
+        WITH previous AS (
+            SELECT id, order_status, product_id, quantity FROM {table}
+            WHERE id IN ({scope_sql})
+            ORDER BY id
+            FOR UPDATE
+        )
+        UPDATE {table} AS o SET order_status = %s, order_updated_at = %s
+        FROM previous
+        WHERE o.id = previous.id AND previous.order_status = ANY(%s)
+        RETURNING previous.order_status, o.*
+    """
+    now = timezone.now()
+    predecessors = sorted(OrderProduct.allowed_predecessors(status))
+
+    with transaction.atomic():
+        with connection.cursor() as cursor:
+            cursor.execute(sql, [*scope_params, status, now, predecessors])
+            columns = [column.name for column in cursor.description[1:]]
+            changed = {}
+            for previous, *values in cursor.fetchall():
+                order = OrderProduct(**dict(zip(columns, values)))
+                order._previous_status = previous
+                changed[order.pk] = order
+
+        restock = {}
+        if status == OrderProduct.CANCELLED:
+            for order in changed.values():
+                if order._previous_status != OrderProduct.CANCELLED:
+                    restock[order.product_id] = restock.get(order.product_id, 0) + order.quantity
+        if restock:
+            product_ids = sorted(restock)
+            product_table = Product._meta.db_table
+            with connection.cursor() as cursor:
+                # UPDATE ... FROM locks in no set order; lock by id first so
+                # concurrent bulk cancels cannot deadlock each other
+                cursor.execute(
+                    f"SELECT id FROM {product_table} WHERE id = ANY(%s) ORDER BY id FOR UPDATE", [product_ids],
+                )
+                cursor.execute(f"""
+                    UPDATE {product_table} AS p SET quantity = p.quantity + r.quantity, updated_at = %s
+                    FROM unnest(%s::varchar[], %s::integer[]) AS r(id, quantity)
+                    WHERE p.id = r.id
+                """, [now, product_ids, [restock[pk] for pk in product_ids]])
+            purge_tags(f"product:{pk}" for pk in product_ids)
+        if status == OrderProduct.COMPLETED:
+            record_sales(
+                sales_row(order) for order in changed.values() if order._previous_status != OrderProduct.COMPLETED
+            )
+        record_order_events(
+            order_event(order, OrderEvent.STATUS_CHANGED) for order in changed.values()
+            if order._previous_status != status
+        )
+
+    failed = [pk for pk in order_ids if pk not in changed]
+    current = dict(queryset.filter(pk__in=failed).values_list('pk', 'order_status')) if failed else {}
+
+    results = []
+    for pk in order_ids:
+        if pk in changed:
+            results.append({'id': pk, 'ok': True, 'previous_status': changed[pk]._previous_status})
+        elif pk in current:
+            results.append({'id': pk, 'ok': False, 'error': f"Invalid status change: {current[pk]} → {status}"})
+        else:
+            results.append({'id': pk, 'ok': False, 'error': "Order not found."})
+    return results
@@ -0,0 +1,84 @@
+from datetime import timedelta
+
+from django.core.exceptions import ValidationError
+from django.db import connection, transaction
+from django.utils import timezone
+
+from .cache import purge_tags
+from .models import Product, StockHold
+
+HOLD_TTL = timedelta(minutes=10)
+# Expired holds deleted per statement by the sweeper
+SWEEP_BATCH_SIZE = 1000
+
+
+def place_holds(customer, items, ttl=HOLD_TTL):
+    """
+    Reserve stock for the (product_id, quantity) `items` of a cart until
+    now + `ttl`, replacing the customer's previous holds on those products.
+
+    The product rows are only locked for this short write, in primary key
+    order like checkout, so concurrent holds never oversell or deadlock.
+    """
+    quantities = {}
+    for product_id, quantity in items:
+        quantities[product_id] = quantities.get(product_id, 0) + quantity
+
+    with transaction.atomic():
+        products = list(
+            Product.objects.select_for_update().filter(pk__in=quantities).order_by('pk')
+        )
+        missing = set(quantities) - {product.pk for product in products}
+        if missing:
+            raise ValidationError(f"Unknown products: {', '.join(sorted(missing))}.")
+
+        now = timezone.now()
+        held = StockHold.objects.held_quantities(quantities, exclude_customer=customer.pk, now=now)
+        short = [
+            f"Only {max(product.quantity - held.get(product.pk, 0), 0)} of {product.name} available."
+            for product in products if product.quantity - held.get(product.pk, 0) < quantities[product.pk]
+        ]
+        if short:
+            raise ValidationError(short)
+
+        StockHold.objects.filter(customer=customer, product_id__in=quantities).delete()
+        # Cached lists show the stock still available
+        purge_tags(f"product:{pk}" for pk in quantities)
+        return StockHold.objects.bulk_create([
+            StockHold(product=product, customer=customer, quantity=quantities[product.pk], expires_at=now + ttl)
+            for product in products
+        ])
+
+
+def release_holds(customer, product_ids=None):
+    holds = StockHold.objects.filter(customer=customer)
+    if product_ids:
+        holds = holds.filter(product_id__in=product_ids)
+    purge_tags(f"product:{pk}" for pk in holds.values_list('product_id', flat=True).distinct())
+    return holds.delete()[0]
+
+
+def sweep_expired_holds(batch_size=SWEEP_BATCH_SIZE):
+    """
+    Delete expired holds in batches of `batch_size`. Expired holds already
+    stopped counting against stock; this keeps the table small and retires
+    cached lists that still show the held stock as unavailable.
+    """
+    table = StockHold._meta.db_table
+    sql = f"""
+        DELETE FROM {table} WHERE id IN (
+            SELECT id FROM {table} WHERE expires_at <= %s
+            LIMIT %s FOR UPDATE SKIP LOCKED
+        )
+        RETURNING product_id
+    """
+    deleted = 0
+    now = timezone.now()
+    while True:
+        with connection.cursor() as cursor:
+            cursor.execute(sql, [now, batch_size])
+            rows = cursor.fetchall()
+        deleted += len(rows)
+        purge_tags(f"product:{product_id}" for product_id, in rows)
+        if len(rows) < batch_size:
+            return deleted
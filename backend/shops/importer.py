@@ -0,0 +1,123 @@
+import codecs
+import csv
+import json
+from itertools import islice
+
+from django.db import DatabaseError, transaction
+
+from .cache import purge_tags
+from .discounts import schedule_expiry
+from .models import Product, ProductCategory
+from .search import refresh_search_vectors
+from .serializers import ProductImportSerializer
+
+IMPORT_BATCH_SIZE = 500
+IMPORT_FORMATS = ('csv', 'ndjson')
+
+
+def _csv_rows(lines):
+    # CSV cells are strings: empty optional cells are dropped, categories
+    # are "|"-separated names and properties a JSON list
+    for row in csv.DictReader(lines):
+        row = {key: value for key, value in row.items() if key and value not in (None, '')}
+        if 'categories' in row:
+            row['categories'] = [name.strip() for name in row['categories'].split('|') if name.strip()]
+        if 'properties' in row:
+            try:
+                row['properties'] = json.loads(row['properties'])
+            except ValueError as e:
+                row = e
+        yield row
+
+
+def _ndjson_rows(lines):
+    for line in lines:
+        if not line.strip():
+            continue
+        try:
+            yield json.loads(line)
+        except ValueError as e:
+            yield e
+
+
+def read_rows(stream, fmt):
+    """
+    Yield (row number, row dict) pairs from a binary stream of CSV or
+    NDJSON, decoding it line by line. A row that cannot be parsed is
+    yielded as the exception instead of the dict.
+    """
+    lines = codecs.iterdecode(stream, 'utf-8-sig')
+    rows = _csv_rows(lines) if fmt == 'csv' else _ndjson_rows(lines)
+    return enumerate(rows, start=1)
+
+
+def import_products(shop, stream, fmt, batch_size=IMPORT_BATCH_SIZE):
+    """
+    Import products for `shop` from a CSV or NDJSON stream in batches.
+
+    Each batch is validated, its category names resolved with one query,
+    and its products and category links written with two bulk_create
+    calls. Invalid rows are reported and skipped; they never abort the file.
+    """
+    report = {'created': 0, 'errors': []}
+    category_ids = {}
+    rows = read_rows(stream, fmt)
+    try:
+        while batch := list(islice(rows, batch_size)):
+            _import_batch(shop, batch, category_ids, report)
+    except (csv.Error, UnicodeDecodeError) as e:
+        # The file itself is broken; keep what was imported so far
+        report['errors'].append({'row': None, 'errors': [f"Could not read file: {e}"]})
+    return report
+
+
+def _import_batch(shop, batch, category_ids, report):
+    valid = []
+    for number, row in batch:
+        if not isinstance(row, dict):
+            report['errors'].append({'row': number, 'errors': [f"Could not parse row: {row}"]})
+            continue
+        serializer = ProductImportSerializer(data=row)
+        if serializer.is_valid():
+            valid.append((number, serializer.validated_data))
+        else:
+            report['errors'].append({'row': number, 'errors': serializer.errors})
+
+    names = {name for _, data in valid for name in data['categories']} - category_ids.keys()
+    if names:
+        category_ids.update(ProductCategory.objects.filter(name__in=names).values_list('name', 'id'))
+
+    products, links = [], []
+    for number, data in valid:
+        data = dict(data)
+        categories = data.pop('categories')
+        unknown = [name for name in categories if name not in category_ids]
+        if unknown:
+            report['errors'].append({'row': number, 'errors': {'categories': [f"Unknown category: {name}" for name in unknown]}})
+            continue
+        product = Product(shop_id=shop, **data)
+        product.clear_expired_discount()
+        products.append((number, product))
+        links.extend(
+            Product.category.through(product_id=product.pk, productcategory_id=category_ids[name])
+            for name in dict.fromkeys(categories)
+        )
+    if not products:
+        return
+
+    try:
+        with transaction.atomic():
+            Product.objects.bulk_create([product for _, product in products])
+            Product.category.through.objects.bulk_create(links)
+            refresh_search_vectors(Product.objects.filter(pk__in=[product.pk for _, product in products]))
+    except DatabaseError as e:
+        report['errors'].extend({'row': number, 'errors': [f"Batch not saved: {e}"]} for number, _ in products)
+        return
+
+    report['created'] += len(products)
+    # bulk_create sends no signals, so purge the cached lists and schedule
+    # the discount expiry here
+    purge_tags(['products', f"shop:{shop.pk}"])
+    ends = [product.discount_end_at for _, product in products if product.new_price and product.discount_end_at]
+    if ends:
+        schedule_expiry(min(ends))
@@ -0,0 +1,135 @@
+from datetime import timedelta
+
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from django.db import connection, transaction
+from django.db.models import Sum
+from django.utils import timezone
+
+from .cache import purge_tags
+from .checkout import take_stock
+from .events import order_event, record_order_events
+from .models import Product, OrderProduct, OrderEvent, OrderIntake, StockHold
+
+# Pending requests fulfilled per product lock
+INTAKE_BATCH_SIZE = 100
+# Pending requests older than this are re-dispatched by the sweeper
+INTAKE_STALE_AFTER = timedelta(minutes=1)
+
+
+def intake_group(token):
+    return f"order-intake.{token}"
+
+
+def intake_result(intake):
+    return {
+        'token': intake.pk,
+        'status': intake.status,
+        'order': intake.order_id,
+        'error': intake.error,
+    }
+
+
+def submit_order(customer, product, quantity, note=None):
+    """Record an order request and queue it for the product's worker"""
+    from .tasks import process_order_intake
+
+    intake = OrderIntake.objects.create(customer=customer, product=product, quantity=quantity, note=note)
+    transaction.on_commit(lambda: process_order_intake.delay(product.pk), robust=True)
+    return intake
+
+
+def process_intakes(product_id, batch_size=INTAKE_BATCH_SIZE):
+    """
+    Fulfil the pending order requests of one product, oldest first, holding
+    its row lock once per batch instead of once per order.
+
+    Workers of one product are serialized by an advisory lock, so other
+    writers of the product row (checkout, holds, ratings) only make this
+    wait for their short row lock. Returns False without waiting when
+    another worker holds the advisory lock, since that worker drains the
+    queue anyway.
+    """
+    processed = []
+    while True:
+        with transaction.atomic():
+            if not try_lock_product(product_id):
+                # Another worker took over between two batches
+                if processed:
+                    return processed
+                return False
+            product = Product.objects.select_for_update().filter(pk=product_id).first()
+            if product is None:
+                return processed
+            intakes = list(
+                OrderIntake.objects.select_for_update(skip_locked=True, of=('self',))
+                .select_related('customer')
+                .filter(product_id=product_id, status=OrderIntake.PENDING)
+                .order_by('created_at')[:batch_size]
+            )
+            if not intakes:
+                break
+
+            now = timezone.now()
+            # Stock held by a customer is only for sale to that customer
+            own_holds = dict(
+                StockHold.objects.active(now).filter(product_id=product_id)
+                .values('customer_id').annotate(held=Sum('quantity')).values_list('customer_id', 'held')
+            )
+            held = sum(own_holds.values())
+            lines, converted = [], set()
+            for intake in intakes:
+                available = product.quantity - held + own_holds.get(intake.customer_id, 0)
+                intake.processed_at = now
+                if available < intake.quantity:
+                    intake.status = OrderIntake.REJECTED
+                    intake.error = f"Only {max(available, 0)} in stock."
+                    continue
+                held -= own_holds.pop(intake.customer_id, 0)
+                converted.add(intake.customer_id)
+                intake.status = OrderIntake.ACCEPTED
+                intake.error = None
+                intake.order = take_stock(
+                    product, intake.customer, intake.quantity, now, OrderProduct._generate_order_number(), intake.note,
+                )
+                lines.append(intake.order)
+
+            if lines:
+                Product.objects.bulk_update([product], ['quantity', 'new_price', 'discount_end_at', 'updated_at'])
+                OrderProduct.objects.bulk_create(lines)
+                record_order_events(order_event(line, OrderEvent.CREATED) for line in lines)
+                StockHold.objects.filter(product_id=product_id, customer_id__in=converted).delete()
+                purge_tags([f"product:{product_id}"])
+            OrderIntake.objects.bulk_update(intakes, ['status', 'order', 'error', 'processed_at'])
+            processed.extend(intake for intake in intakes if intake.status != OrderIntake.PENDING)
+            transaction.on_commit(lambda intakes=intakes: notify(intakes))
+
+    return processed
+
+
+def try_lock_product(product_id):
+    """Take the intake lock of `product_id` until commit, unless it is taken"""
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT pg_try_advisory_xact_lock(hashtext(%s))", [f"order-intake:{product_id}"])
+        return cursor.fetchone()[0]
+
+
+def stale_intake_products(now=None):
+    """Products with requests that stayed Pending longer than INTAKE_STALE_AFTER"""
+    cutoff = (now or timezone.now()) - INTAKE_STALE_AFTER
+    return list(
+        OrderIntake.objects.filter(status=OrderIntake.PENDING, created_at__lte=cutoff)
+        .order_by().values_list('product_id', flat=True).distinct()
+    )
+
+
+def notify(intakes):
+    """Push each result to the websocket clients waiting on its token"""
+    channel_layer = get_channel_layer()
+    if channel_layer is None:
+        return
+    for intake in intakes:
+        async_to_sync(channel_layer.group_send)(intake_group(intake.pk), {
+            'type': 'intake.result',
+            'result': intake_result(intake),
+        })
@@ -0,0 +1,32 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from shops.exporter import EXPORT_FORMATS, export_products
+from shops.models import ProductImage, Shop
+
+
+class Command(BaseCommand):
+    help = "Stream a shop's catalog to a CSV or NDJSON file"
+
+    def add_arguments(self, parser):
+        parser.add_argument('shop_id')
+        parser.add_argument('--format', choices=EXPORT_FORMATS, default='csv')
+        parser.add_argument('--output', help="File to write, defaults to stdout")
+
+    def handle(self, *args, **options):
+        try:
+            shop = Shop.objects.get(pk=options['shop_id'])
+        except Shop.DoesNotExist:
+            raise CommandError(f"Shop {options['shop_id']} does not exist")
+
+        media_storage = ProductImage._meta.get_field('media').storage
+        lines = export_products(shop, options['format'], media_storage.url)
+
+        output = open(options['output'], 'wb') if options['output'] else sys.stdout.buffer
+        try:
+            for line in lines:
+                output.write(line)
+        finally:
+            if options['output']:
+                output.close()
@@ -0,0 +1,33 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from shops.importer import IMPORT_BATCH_SIZE, IMPORT_FORMATS, import_products
+from shops.models import Shop
+
+
+class Command(BaseCommand):
+    help = "Bulk-import products into a shop from a CSV or NDJSON file"
+
+    def add_arguments(self, parser):
+        parser.add_argument('shop_id')
+        parser.add_argument('path')
+        parser.add_argument('--format', choices=IMPORT_FORMATS, help="Defaults to the file extension")
+        parser.add_argument('--batch-size', type=int, default=IMPORT_BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        try:
+            shop = Shop.objects.get(pk=options['shop_id'])
+        except Shop.DoesNotExist:
+            raise CommandError(f"Shop {options['shop_id']} does not exist")
+
+        fmt = options['format'] or options['path'].rsplit('.', 1)[-1].lower()
+        if fmt not in IMPORT_FORMATS:
+            raise CommandError(f"Unknown format {fmt!r}, use --format")
+
+        with open(options['path'], 'rb') as stream:
+            report = import_products(shop, stream, fmt, options['batch_size'])
+
+        for error in report['errors']:
+            self.stderr.write(f"Row {error['row']}: {error['errors']}")
+        self.stdout.write(self.style.SUCCESS(
+            f"Imported {report['created']} products, {len(report['errors'])} rows rejected"
+        ))
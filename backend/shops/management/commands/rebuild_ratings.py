@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from shops.models import Product, ProductRating, Shop, ShopRating
+from shops.ratings import rebuild_rating_aggregates
+
+
+class Command(BaseCommand):
+    help = "Recompute the stored rating aggregates of every product and shop"
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            products = rebuild_rating_aggregates(Product, ProductRating, 'product')
+            shops = rebuild_rating_aggregates(Shop, ShopRating, 'shop')
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt ratings for {products} products and {shops} shops"))
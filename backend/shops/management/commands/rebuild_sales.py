@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from shops.sales import rebuild_sales_rollups
+
+
+class Command(BaseCommand):
+    help = "Recompute the daily and monthly sales rollups from the completed orders"
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            rows = rebuild_sales_rollups()
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {rows} sales rollup rows"))
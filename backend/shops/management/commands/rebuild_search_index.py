@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+
+from shops.models import Product
+from shops.search import refresh_search_vectors
+
+
+class Command(BaseCommand):
+    help = "Rebuild the full-text search vector of every product"
+
+    def handle(self, *args, **options):
+        updated = refresh_search_vectors(Product.objects.all())
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt search vectors for {updated} products"))
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.7 on 2026-10-18 08:34
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('customers', '0001_initial'),
+        ('shops', '0005_remove_product_properties_product_properties'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='orderproduct',
+            index=models.Index(fields=['shop', 'order_date', 'id'], name='shops_order_shop_id_f9aeb6_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['created_at', 'id'], name='shops_produ_created_d434c2_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='shop',
+            index=models.Index(fields=['created_at', 'id'], name='shops_shop_created_95cc0f_idx'),
+        ),
+    ]
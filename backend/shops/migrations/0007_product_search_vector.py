@@ -0,0 +1,31 @@
+# Generated by Django 5.2.7 on 2026-10-18 08:35
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.db import migrations
+
+
+def populate_search_vectors(apps, schema_editor):
+    from shops.search import refresh_search_vectors
+    Product = apps.get_model('shops', 'Product')
+    refresh_search_vectors(Product.objects.all())
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shops', '0006_keyset_pagination_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='shops_produ_search__15c9e2_gin'),
+        ),
+        migrations.RunPython(populate_search_vectors, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.7 on 2026-10-18 08:39
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shops', '0009_rating_aggregates'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='productcategory',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddField(
+            model_name='productproperty',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+    ]
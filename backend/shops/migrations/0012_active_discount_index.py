@@ -0,0 +1,21 @@
+# Generated by Django 5.2.7 on 2026-10-18 08:45
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shops', '0011_product_price_index'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='product',
+            name='shops_produ_discoun_5f3557_idx',
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(condition=models.Q(('discount_end_at__isnull', False), ('new_price__gt', 0)), fields=['discount_end_at'], name='product_active_discount_idx'),
+        ),
+    ]
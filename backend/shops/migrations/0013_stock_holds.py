@@ -0,0 +1,31 @@
+# Generated by Django 5.2.7 on 2026-10-18 08:46
+
+import django.core.validators
+import django.db.models.deletion
+import shops.models
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('customers', '0001_initial'),
+        ('shops', '0012_active_discount_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StockHold',
+            fields=[
+                ('id', models.CharField(default=shops.models.default_hold_id, editable=False, max_length=255, primary_key=True, serialize=False, unique=True)),
+                ('quantity', models.PositiveIntegerField(validators=[django.core.validators.MinValueValidator(1)])),
+                ('expires_at', models.DateTimeField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('customer', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='stock_holds', to='customers.guestuser')),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='holds', to='shops.product')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['product', 'expires_at'], name='shops_stock_product_28ecdb_idx'), models.Index(fields=['expires_at'], name='shops_stock_expires_96773f_idx')],
+            },
+        ),
+    ]
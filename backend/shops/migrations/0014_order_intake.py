@@ -0,0 +1,35 @@
+# Generated by Django 5.2.7 on 2026-10-18 08:47
+
+import django.core.validators
+import django.db.models.deletion
+import shops.models
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('customers', '0001_initial'),
+        ('shops', '0013_stock_holds'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OrderIntake',
+            fields=[
+                ('id', models.CharField(default=shops.models.default_intake_id, editable=False, max_length=255, primary_key=True, serialize=False, unique=True)),
+                ('quantity', models.PositiveIntegerField(validators=[django.core.validators.MinValueValidator(1)])),
+                ('note', models.TextField(blank=True, null=True)),
+                ('status', models.CharField(choices=[('Pending', 'Pending'), ('Accepted', 'Accepted'), ('Rejected', 'Rejected')], default='Pending', max_length=8)),
+                ('error', models.TextField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('processed_at', models.DateTimeField(blank=True, null=True)),
+                ('customer', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='order_intakes', to='customers.guestuser')),
+                ('order', models.OneToOneField(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='intake', to='shops.orderproduct')),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='intakes', to='shops.product')),
+            ],
+            options={
+                'indexes': [models.Index(condition=models.Q(('status', 'Pending')), fields=['product', 'created_at'], name='order_intake_pending_idx')],
+            },
+        ),
+    ]
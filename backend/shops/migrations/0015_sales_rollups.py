@@ -0,0 +1,81 @@
+# Generated by Django 5.2.7 on 2026-10-18 08:50
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def populate_sales_rollups(apps, schema_editor):
+    from shops.sales import rebuild_sales_rollups
+    rebuild_sales_rollups(apps.get_model('shops', 'OrderProduct'), [
+        (apps.get_model('shops', 'ShopSalesDaily'), 'shop', 'day'),
+        (apps.get_model('shops', 'ShopSalesMonthly'), 'shop', 'month'),
+        (apps.get_model('shops', 'ProductSalesDaily'), 'product', 'day'),
+        (apps.get_model('shops', 'ProductSalesMonthly'), 'product', 'month'),
+    ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shops', '0014_order_intake'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProductSalesDaily',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('order_count', models.IntegerField(default=0)),
+                ('units', models.IntegerField(default=0)),
+                ('revenue', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('day', models.DateField()),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='sales_daily', to='shops.product')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('product', 'day'), name='product_sales_daily_unique')],
+            },
+        ),
+        migrations.CreateModel(
+            name='ProductSalesMonthly',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('order_count', models.IntegerField(default=0)),
+                ('units', models.IntegerField(default=0)),
+                ('revenue', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('month', models.DateField()),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='sales_monthly', to='shops.product')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('product', 'month'), name='product_sales_monthly_unique')],
+            },
+        ),
+        migrations.CreateModel(
+            name='ShopSalesDaily',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('order_count', models.IntegerField(default=0)),
+                ('units', models.IntegerField(default=0)),
+                ('revenue', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('day', models.DateField()),
+                ('shop', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='sales_daily', to='shops.shop')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('shop', 'day'), name='shop_sales_daily_unique')],
+            },
+        ),
+        migrations.CreateModel(
+            name='ShopSalesMonthly',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('order_count', models.IntegerField(default=0)),
+                ('units', models.IntegerField(default=0)),
+                ('revenue', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('month', models.DateField()),
+                ('shop', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='sales_monthly', to='shops.shop')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('shop', 'month'), name='shop_sales_monthly_unique')],
+            },
+        ),
+        migrations.RunPython(populate_sales_rollups, migrations.RunPython.noop),
+    ]
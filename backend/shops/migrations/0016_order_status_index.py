@@ -0,0 +1,18 @@
+# Generated by Django 5.2.7 on 2026-10-18 08:51
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('customers', '0001_initial'),
+        ('shops', '0015_sales_rollups'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='orderproduct',
+            index=models.Index(fields=['shop', 'order_status', 'order_date', 'id'], name='shops_order_shop_id_e8a3f0_idx'),
+        ),
+    ]
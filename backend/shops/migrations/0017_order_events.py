@@ -0,0 +1,31 @@
+# Generated by Django 5.2.7 on 2026-10-18 08:53
+
+import django.core.serializers.json
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shops', '0016_order_status_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OrderEvent',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('order_id', models.CharField(max_length=255)),
+                ('event_type', models.CharField(choices=[('created', 'Created'), ('status_changed', 'Status changed'), ('deleted', 'Deleted')], max_length=14)),
+                ('from_status', models.CharField(blank=True, max_length=11, null=True)),
+                ('to_status', models.CharField(blank=True, max_length=11, null=True)),
+                ('payload', models.JSONField(default=dict, encoder=django.core.serializers.json.DjangoJSONEncoder)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('shop', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='order_events', to='shops.shop')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['shop', 'id'], name='shops_order_shop_id_016e29_idx')],
+            },
+        ),
+    ]
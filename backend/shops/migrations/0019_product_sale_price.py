@@ -0,0 +1,26 @@
+# Generated by Django 5.2.7 on 2026-10-18 09:03
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shops', '0018_order_event_shop_unenforced'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='product',
+            name='shops_produ_price_b27345_idx',
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='sale_price',
+            field=models.GeneratedField(db_persist=True, expression=models.Case(models.When(discount_end_at__isnull=False, new_price__gt=0, then=models.F('new_price')), default=models.F('price')), output_field=models.DecimalField(decimal_places=2, max_digits=10)),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['sale_price', 'id'], name='shops_produ_sale_pr_447930_idx'),
+        ),
+    ]
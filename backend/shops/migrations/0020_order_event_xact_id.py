@@ -0,0 +1,27 @@
+# Generated by Django 5.2.7 on 2026-10-18 09:12
+
+import django.db.models.expressions
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shops', '0019_product_sale_price'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='orderevent',
+            name='shops_order_shop_id_016e29_idx',
+        ),
+        migrations.AddField(
+            model_name='orderevent',
+            name='xact_id',
+            field=models.BigIntegerField(db_default=django.db.models.expressions.RawSQL('pg_current_xact_id()::text::bigint', []), editable=False),
+        ),
+        migrations.AddIndex(
+            model_name='orderevent',
+            index=models.Index(fields=['shop', 'xact_id', 'id'], name='shops_order_shop_id_05d21e_idx'),
+        ),
+    ]
@@ -1,8 +1,16 @@
+from decimal import Decimal
+
 from django.core.exceptions import ValidationError
 from django.core.serializers import serialize
-from django.db import models, IntegrityError
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import models, connection, IntegrityError
+from django.db.models.functions import Cast, Coalesce, Greatest, Now, Round, TruncMonth, Upper
+from django.db.models.expressions import RawSQL
 from django.contrib.postgres.fields import ArrayField
+from django.contrib.postgres.indexes import GinIndex, OpClass
+from django.contrib.postgres.search import SearchVectorField
 from core.utils import (custom_id)
+from .cache import purge_tags
 from django.utils import timezone
 from django.core.validators import MinValueValidator, MaxValueValidator
 from django.db import transaction
@@ -25,6 +33,31 @@ def default_category_id():
     return custom_id(prefix="cat").lower()
 def default_property_id():
     return custom_id(prefix="pro").lower()
+def default_hold_id():
+    return custom_id(prefix="hold").lower()
+def default_intake_id():
+    return custom_id(prefix="intake").lower()
+
+class RatingAggregates(models.Model):
+    """
+    Denormalized rating totals, kept up to date by shops.signals with
+    F-expression updates and rebuilt by the rebuild_ratings command.
+    """
+    rating_sum = models.PositiveIntegerField(default=0, editable=False)
+    rating_count = models.PositiveIntegerField(default=0, editable=False)
+    rating_1_count = models.PositiveIntegerField(default=0, editable=False)
+    rating_2_count = models.PositiveIntegerField(default=0, editable=False)
+    rating_3_count = models.PositiveIntegerField(default=0, editable=False)
+    rating_4_count = models.PositiveIntegerField(default=0, editable=False)
+    rating_5_count = models.PositiveIntegerField(default=0, editable=False)
+
+    class Meta:
+        abstract = True
+
+def average_rating(obj):
+    if not obj.rating_count:
+        return 0.0
+    return round(obj.rating_sum / obj.rating_count, 1)
 
 class ProductCategory(models.Model):
     id = models.CharField(
@@ -37,10 +70,14 @@ class ProductCategory(models.Model):
     name = models.CharField(max_length=255, unique=True)
     description = models.TextField(blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         verbose_name_plural = "Product Categories"
         ordering = ['name']
+        indexes = [
+            GinIndex(OpClass(Upper('name'), name='gin_trgm_ops'), name='category_name_trgm_idx'),
+        ]
 
     def __str__(self):
         return self.name
@@ -57,6 +94,7 @@ class ProductProperty(models.Model):
     values = ArrayField(models.CharField(max_length=255), blank=True, default=list)
     description = models.TextField(blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         verbose_name_plural = "Product Properties"
@@ -65,7 +103,7 @@ class ProductProperty(models.Model):
     def __str__(self):
         return self.name
 
-class Shop(models.Model):
+class Shop(RatingAggregates):
     id = models.CharField(
         primary_key=True,
         max_length=255,
@@ -95,20 +133,79 @@ class Shop(models.Model):
 
     @property
     def average_rating(self):
-        # Warning: N+1 risk in lists → prefer annotation in views
-        ratings = self.shop_ratings.all()
-        if not ratings.exists():
-            return 0.0
-        return round(sum(r.rating for r in ratings) / ratings.count(), 1)
-
-    @property
-    def rating_count(self):
-        return self.shop_ratings.count()
+        return average_rating(self)
 
     def __str__(self):
         return f"{self.name} - {self.template} - {self.id}"
 
-class Product(models.Model):
+    class Meta:
+        indexes = [
+            models.Index(fields=['created_at', 'id']),
+            GinIndex(OpClass(Upper('name'), name='gin_trgm_ops'), name='shop_name_trgm_idx'),
+        ]
+
+class ProductQuerySet(models.QuerySet):
+    def for_listing(self):
+        """Load everything ProductSerializer reads in a fixed number of queries"""
+        # Images without a file are skipped, as the serializer's fallback does
+        primary_image = ProductImage.objects.filter(
+            product_id=models.OuterRef('pk'),
+        ).exclude(media='').order_by('-is_primary', 'order', 'updated_at', 'created_at').values('media')[:1]
+        return self.select_related('shop_id').defer('search_vector').prefetch_related(
+            'images',
+            models.Prefetch('category', queryset=ProductCategory.objects.only('id', 'name')),
+        ).annotate(
+            primary_image_media=models.Subquery(primary_image),
+            available_quantity=self.available_quantity(),
+        )
+
+    @staticmethod
+    def available_quantity():
+        """Stock for sale: quantity minus the active holds, see shops.holds"""
+        # Now() rather than active(): views build this queryset at import time
+        held = StockHold.objects.filter(
+            product_id=models.OuterRef('pk'), expires_at__gt=Now(),
+        ).order_by().values('product_id').annotate(held=models.Sum('quantity')).values('held')
+        return Greatest(
+            models.F('quantity') - Coalesce(models.Subquery(held), 0),
+            models.Value(0),
+            output_field=models.IntegerField(),
+        )
+
+    def with_effective_price(self):
+        """
+        Annotate the price a customer pays right now: effective_price,
+        discount_active, discount_amount and discount_percent. Filter and
+        sort on the indexed sale_price instead.
+        """
+        active = models.Q(new_price__gt=0, discount_end_at__gt=Now())
+        return self.annotate(
+            discount_active=models.Case(
+                models.When(active, then=models.Value(True)),
+                default=models.Value(False),
+                output_field=models.BooleanField(),
+            ),
+            effective_price=models.Case(
+                models.When(active, then=models.F('new_price')),
+                default=models.F('price'),
+                output_field=models.DecimalField(max_digits=10, decimal_places=2),
+            ),
+            discount_amount=models.Case(
+                models.When(active, new_price__lt=models.F('price'), then=models.F('price') - models.F('new_price')),
+                default=models.Value(Decimal(0)),
+                output_field=models.DecimalField(max_digits=10, decimal_places=2),
+            ),
+            discount_percent=models.Case(
+                models.When(
+                    active, price__gt=0,
+                    then=Cast(Round((models.F('price') - models.F('new_price')) * 100 / models.F('price')), models.IntegerField()),
+                ),
+                default=models.Value(0),
+                output_field=models.IntegerField(),
+            ),
+        )
+
+class Product(RatingAggregates):
     id = models.CharField(
         primary_key=True,
         max_length=255,
@@ -123,6 +220,16 @@ class Product(models.Model):
     new_price = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True, default=0)
     price = models.DecimalField(max_digits=10, decimal_places=2, default=0)
     discount_end_at = models.DateTimeField(null=True, blank=True)
+    # Price with any scheduled discount applied, indexed for filtering and
+    # sorting by price. Ended discounts are cleared by shops.discounts.
+    sale_price = models.GeneratedField(
+        expression=models.Case(
+            models.When(new_price__gt=0, discount_end_at__isnull=False, then=models.F('new_price')),
+            default=models.F('price'),
+        ),
+        output_field=models.DecimalField(max_digits=10, decimal_places=2),
+        db_persist=True,
+    )
     currency_unit = models.CharField(max_length=5, default="EUR")
     condition = models.CharField(max_length=20, blank=True, null=True)
     category = models.ManyToManyField(ProductCategory, related_name='products')
@@ -133,21 +240,25 @@ class Product(models.Model):
     refund_policy = models.TextField(blank=True, null=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
+    # Maintained by shops.signals, see shops.search.refresh_search_vectors
+    search_vector = SearchVectorField(null=True, editable=False)
+
+    objects = ProductQuerySet.as_manager()
     
-    def is_discount_expired(self):
+    def is_discount_expired(self, now=None):
         if self.discount_end_at is None:
             return True
-        return timezone.now() > self.discount_end_at
+        return (now or timezone.now()) > self.discount_end_at
     
-    def is_discount_active(self):
+    def is_discount_active(self, now=None):
         """Check if discount is currently active"""
         return (
             self.new_price > 0 and
-            not self.is_discount_expired()
+            not self.is_discount_expired(now)
         )
     
-    def get_current_price(self):
-        if self.is_discount_active():
+    def get_current_price(self, now=None):
+        if self.is_discount_active(now):
             return self.new_price
         return self.price
     
@@ -158,12 +269,16 @@ class Product(models.Model):
             self.discount_end_at = None
             self.save(update_fields=['new_price', 'discount_end_at', 'updated_at'])
     
+    def clear_expired_discount(self, now=None):
+        """Reset an expired discount in memory, without saving"""
+        if self.is_discount_expired(now) and self.new_price is not None:
+            self.new_price = 0
+            self.discount_end_at = None
+
     def save(self, *args, **kwargs):
         """Override save to auto-expire discount if needed"""
         # Auto-clear expired discount before saving
-        if self.is_discount_expired() and self.new_price is not None:
-            self.new_price = 0
-            self.discount_end_at = None
+        self.clear_expired_discount()
         
         super().save(*args, **kwargs)
     
@@ -194,15 +309,7 @@ class Product(models.Model):
     @property
     def average_rating(self):
         """Get average rating for product"""
-        ratings = self.product_ratings.all()
-        if not ratings.exists():
-            return 0.0
-        return round(sum(r.rating for r in ratings) / ratings.count(), 1)
-    
-    @property
-    def rating_count(self):
-        """Get total number of ratings"""
-        return self.product_ratings.count()
+        return average_rating(self)
     
     def __str__(self):
         return f"{self.name} - {self.id}"
@@ -210,8 +317,17 @@ class Product(models.Model):
     class Meta:
         ordering = ['-created_at']
         indexes = [
-            models.Index(fields=['discount_end_at']),
+            # Active discounts only, see shops.discounts
+            models.Index(
+                fields=['discount_end_at'],
+                condition=models.Q(new_price__gt=0, discount_end_at__isnull=False),
+                name='product_active_discount_idx',
+            ),
             models.Index(fields=['created_at']),
+            models.Index(fields=['created_at', 'id']),
+            models.Index(fields=['sale_price', 'id']),
+            GinIndex(fields=['search_vector']),
+            GinIndex(OpClass(Upper('name'), name='gin_trgm_ops'), name='product_name_trgm_idx'),
         ]
 
 class ProductImage(models.Model):
@@ -274,6 +390,20 @@ class GuestUserRating(models.Model):
     rating = models.IntegerField(validators=[MinValueValidator(1), MaxValueValidator(5)])
     review = models.TextField(null=True, blank=True)
 
+class OrderProductQuerySet(models.QuerySet):
+    def for_listing(self):
+        """
+        Load orders with everything OrderSerializer reads in one joined
+        query, including the monthly sales of completed orders.
+        """
+        monthly_sales = ShopSalesMonthly.objects.filter(
+            shop_id=models.OuterRef('shop_id'), month=models.OuterRef('order_month'),
+        ).values('revenue')[:1]
+        return self.select_related('shop', 'product', 'customer').defer('product__search_vector').annotate(
+            order_month=TruncMonth('order_date', output_field=models.DateField()),
+            monthly_sales_total=models.Subquery(monthly_sales),
+        )
+
 class OrderProduct(models.Model):
     PENDING = 'Pending'
     CANCELLED = 'Cancelled'
@@ -307,6 +437,14 @@ class OrderProduct(models.Model):
     order_date = models.DateTimeField(auto_now_add=True)
     order_updated_at = models.DateTimeField(auto_now=True)
 
+    objects = OrderProductQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['shop', 'order_date', 'id']),
+            models.Index(fields=['shop', 'order_status', 'order_date', 'id']),
+        ]
+
     def __str__(self):
         return f"{self.order_number} {self.product.name} - {self.customer.email} - {self.order_status}"
 
@@ -314,7 +452,8 @@ class OrderProduct(models.Model):
         if self.quantity < 1:
             raise ValidationError("Quantity must be at least 1.")
 
-    def _generate_order_number(self):
+    @staticmethod
+    def _generate_order_number():
         """Generate a unique order number"""
         import random
         import string
@@ -333,66 +472,346 @@ class OrderProduct(models.Model):
         CANCELLED: set(),
     }
 
-    def save(self, *args, **kwargs):
-        self.full_clean()
+    @classmethod
+    def allowed_predecessors(cls, status):
+        """Statuses an order may be in to move to `status` (itself included)"""
+        return {status} | {previous for previous, targets in cls.ALLOWED_TRANSITIONS.items() if status in targets}
+
+    def save(self, *args, force_insert=False, force_update=False, update_fields=None, **kwargs):
+        # Foreign keys are checked by the stock and status UPDATEs below,
+        # instead of one existence query each
+        self.clean_fields(exclude=['product', 'shop', 'customer'])
+        self.clean()
+
+        if update_fields is not None and not {'order_status', 'quantity'} & set(update_fields):
+            # Neither stock nor status moves: a plain write of those fields,
+            # which the status receivers in shops.signals must not count
+            self._previous_status = self.order_status
+            super().save(*args, update_fields=update_fields, **kwargs)
+            return
 
         with transaction.atomic():
-            product = Product.objects.select_for_update().get(pk=self.product.pk)
+            if force_insert or (self._state.adding and not force_update):
+                self._take_stock()
+                try:
+                    super().save(*args, force_insert=force_insert, **kwargs)
+                except IntegrityError as e:
+                    if 'order_number' in str(e):
+                        self.order_number = self._generate_order_number()
+                        super().save(*args, force_insert=force_insert, **kwargs)
+                    else:
+                        raise
+            else:
+                self._change_status(update_fields)
+        # A listed order's annotated monthly sales may no longer hold
+        self.__dict__.pop('monthly_sales_total', None)
+
+    def _relations_sql(self):
+        """A WHERE condition that the %(product)s, %(shop)s and %(customer)s rows exist"""
+        conditions = []
+        for name in ('product', 'shop', 'customer'):
+            related = self._meta.get_field(name).related_model._meta
+            conditions.append(f"EXISTS (SELECT 1 FROM {related.db_table} WHERE {related.pk.column} = %({name})s)")
+        return ' AND '.join(conditions)
+
+    def _check_relations(self):
+        """Raise a ValidationError naming a related row that does not exist"""
+        for name in ('product', 'shop', 'customer'):
+            field = self._meta.get_field(name)
+            value = getattr(self, field.attname)
+            if value is None or not field.related_model._default_manager.filter(pk=value).exists():
+                label = field.related_model._meta.verbose_name.capitalize()
+                raise ValidationError({name: f"{label} {value} does not exist."})
+
+    def _take_stock(self):
+        """
+        Decrement stock, clear an expired discount and read the price in one
+        conditional UPDATE; stock held by other customers is not for sale and
+        the customer's own hold on the product turns into the order.
+        """
+        if self.order_status == self.CANCELLED:
+            raise ValidationError("Cannot create cancelled order.")
+
+        product_table = Product._meta.db_table
+        hold_table = StockHold._meta.db_table
+        now = timezone.now()
+        sql = f"""
+            WITH released AS (
+                DELETE FROM {hold_table} WHERE product_id = %(product)s AND customer_id = %(customer)s
+            )
+            UPDATE {product_table} AS p SET
+                quantity = p.quantity - %(quantity)s,
+                new_price = CASE WHEN p.discount_end_at IS NULL OR p.discount_end_at < %(now)s
+                    THEN 0 ELSE p.new_price END,
+                discount_end_at = CASE WHEN p.discount_end_at IS NULL OR p.discount_end_at < %(now)s
+                    THEN NULL ELSE p.discount_end_at END,
+                updated_at = %(now)s
+            WHERE p.id = %(product)s AND {self._relations_sql()} AND p.quantity - coalesce((
+                SELECT sum(h.quantity) FROM {hold_table} h
+                WHERE h.product_id = p.id AND h.customer_id <> %(customer)s AND h.expires_at > %(now)s
+            ), 0) >= %(quantity)s
+            RETURNING p.price, p.new_price
+        """
+        params = {
+            'product': self.product_id, 'shop': self.shop_id, 'customer': self.customer_id,
+            'quantity': self.quantity, 'now': now,
+        }
+        with connection.cursor() as cursor:
+            cursor.execute(sql, params)
+            row = cursor.fetchone()
+        if row is None:
+            self._stock_error(now)
+
+        price, new_price = row
+        # An unexpired discount is the only way new_price survives the UPDATE
+        self.unit_price = new_price if new_price and new_price > 0 else price
+        self.order_number = self._generate_order_number()
+        self.order_total = self.unit_price * self.quantity
+        purge_tags([f"product:{self.product_id}"])
+
+    def _stock_error(self, now):
+        self._check_relations()
+        product = Product.objects.filter(pk=self.product_id).values('quantity').first()
+        held = StockHold.objects.held_quantities([self.product_id], exclude_customer=self.customer_id, now=now)
+        available = product['quantity'] - held.get(self.product_id, 0)
+        raise ValidationError(f"Only {max(available, 0)} in stock.")
+
+    def _change_status(self, update_fields=None):
+        """
+        Write the order with one UPDATE guarded by the allowed predecessors of
+        the new status, restocking the product when the order is cancelled.
+        """
+        update_fields = frozenset(update_fields) if update_fields is not None else None
+        # Model.save() is bypassed, so send its signals here
+        models.signals.pre_save.send(
+            sender=OrderProduct, instance=self, raw=False, using=self._state.db, update_fields=update_fields,
+        )
+        fields = [
+            f for f in self._meta.concrete_fields
+            if not f.primary_key and (update_fields is None or f.name in update_fields or f.attname in update_fields)
+        ]
+        params = {f"f{index}": f.get_db_prep_save(f.pre_save(self, False), connection) for index, f in enumerate(fields)}
+        params.update({
+            'id': self.pk, 'quantity': self.quantity,
+            'product': self.product_id, 'shop': self.shop_id, 'customer': self.customer_id,
+            'predecessors': sorted(self.allowed_predecessors(self.order_status)),
+        })
+        table = self._meta.db_table
+        sql = f"""
+            WITH previous AS (
+                SELECT id, order_status FROM {table} WHERE id = %(id)s FOR UPDATE
+            )
+            UPDATE {table} AS o SET {', '.join(f'{f.column} = %(f{index})s' for index, f in enumerate(fields))}
+            FROM previous
+            WHERE o.id = previous.id AND o.quantity = %(quantity)s AND previous.order_status = ANY(%(predecessors)s)
+                AND {self._relations_sql()}
+            RETURNING previous.order_status
+        """
+        with connection.cursor() as cursor:
+            cursor.execute(sql, params)
+            row = cursor.fetchone()
+        if row is None:
+            self._status_error()
+
+        self._previous_status = row[0]
+        if self._previous_status != self.CANCELLED and self.order_status == self.CANCELLED:
+            Product.objects.filter(pk=self.product_id).update(
+                quantity=models.F('quantity') + self.quantity, updated_at=timezone.now(),
+            )
+            purge_tags([f"product:{self.product_id}"])
+        models.signals.post_save.send(
+            sender=OrderProduct, instance=self, created=False, update_fields=update_fields, raw=False,
+            using=self._state.db,
+        )
 
-            # Check if this is an update (object exists in DB) or create (new object)
-            is_update = self.pk and OrderProduct.objects.filter(pk=self.pk).exists()
+    def _status_error(self):
+        previous = OrderProduct.objects.filter(pk=self.pk).values('quantity', 'order_status').first()
+        if previous is None:
+            raise ValidationError(f"Order {self.pk} does not exist.")
+        self._check_relations()
+        if previous['quantity'] != self.quantity:
+            raise ValidationError("Cannot change quantity after creation.")
+        raise ValidationError(f"Invalid status change: {previous['order_status']} → {self.order_status}")
 
-            if is_update:  # UPDATE
-                previous = OrderProduct.objects.select_for_update().get(pk=self.pk)
+    @property
+    def monthly_sales(self):
+        """Total completed sales of the shop in the month of this order"""
+        if self.order_status == 'Completed':
+            # Annotated by OrderProduct.objects.for_listing()
+            if hasattr(self, 'monthly_sales_total'):
+                return self.monthly_sales_total or 0
+            month = timezone.localtime(self.order_date).date().replace(day=1)
+            return ShopSalesMonthly.objects.filter(
+                shop_id=self.shop_id, month=month,
+            ).values_list('revenue', flat=True).first() or 0
+        return 0
 
-                if previous.quantity != self.quantity:
-                    raise ValidationError("Cannot change quantity after creation.")
+    @property
+    def total(self):
+        return self.unit_price * self.quantity
+
+
+class StockHoldQuerySet(models.QuerySet):
+    def active(self, now=None):
+        return self.filter(expires_at__gt=now or timezone.now())
+
+    def held_quantities(self, product_ids, exclude_customer=None, now=None):
+        """Quantity under active holds per product id, in one grouped query"""
+        holds = self.active(now).filter(product_id__in=product_ids)
+        if exclude_customer is not None:
+            holds = holds.exclude(customer_id=exclude_customer)
+        return dict(holds.values('product_id').annotate(held=models.Sum('quantity')).values_list('product_id', 'held'))
+
+class StockHold(models.Model):
+    """
+    Quantity of a product reserved for a customer during checkout. Holds do
+    not touch Product.quantity: the stock for sale is the quantity minus the
+    active holds, so an expired hold needs no release. See shops.holds.
+    """
+    id = models.CharField(
+        primary_key=True,
+        max_length=255,
+        default=default_hold_id,
+        editable=False,
+        unique=True,
+    )
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='holds')
+    customer = models.ForeignKey('customers.GuestUser', on_delete=models.CASCADE, related_name='stock_holds')
+    quantity = models.PositiveIntegerField(validators=[MinValueValidator(1)])
+    expires_at = models.DateTimeField()
+    created_at = models.DateTimeField(auto_now_add=True)
 
-                if self.order_status != previous.order_status:
-                    allowed = self.ALLOWED_TRANSITIONS.get(previous.order_status, set())
-                    if self.order_status not in allowed:
-                        raise ValidationError(f"Invalid status change: {previous.order_status} → {self.order_status}")
+    objects = StockHoldQuerySet.as_manager()
 
-                if previous.order_status != self.CANCELLED and self.order_status == self.CANCELLED:
-                    product.quantity += previous.quantity
-                    product.save(update_fields=['quantity', 'updated_at'])
+    class Meta:
+        indexes = [
+            models.Index(fields=['product', 'expires_at']),
+            models.Index(fields=['expires_at']),
+        ]
 
-            else:  # CREATE
-                if self.order_status == self.CANCELLED:
-                    raise ValidationError("Cannot create cancelled order.")
+    def __str__(self):
+        return f"{self.quantity} x {self.product_id} for {self.customer_id} until {self.expires_at}"
+
+class OrderIntake(models.Model):
+    """
+    An order request accepted without waiting for the product lock; a worker
+    turns it into an OrderProduct or rejects it. See shops.intake.
+    """
+    PENDING = 'Pending'
+    ACCEPTED = 'Accepted'
+    REJECTED = 'Rejected'
+    STATUS_CHOICES = [
+        (PENDING, 'Pending'),
+        (ACCEPTED, 'Accepted'),
+        (REJECTED, 'Rejected'),
+    ]
 
-                if product.quantity < self.quantity:
-                    raise ValidationError(f"Only {product.quantity} in stock.")
+    id = models.CharField(
+        primary_key=True,
+        max_length=255,
+        default=default_intake_id,
+        editable=False,
+        unique=True,
+    )
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='intakes')
+    customer = models.ForeignKey('customers.GuestUser', on_delete=models.CASCADE, related_name='order_intakes')
+    quantity = models.PositiveIntegerField(validators=[MinValueValidator(1)])
+    note = models.TextField(blank=True, null=True)
+    status = models.CharField(max_length=8, choices=STATUS_CHOICES, default=PENDING)
+    order = models.OneToOneField(OrderProduct, on_delete=models.SET_NULL, null=True, blank=True, related_name='intake')
+    error = models.TextField(blank=True, null=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    processed_at = models.DateTimeField(null=True, blank=True)
 
-                product.expire_discount_if_needed()
-                self.unit_price = product.get_current_price()
-                self.order_number = self._generate_order_number()
-                self.order_total = self.unit_price * self.quantity
+    class Meta:
+        indexes = [
+            models.Index(fields=['product', 'created_at'], condition=models.Q(status='Pending'), name='order_intake_pending_idx'),
+        ]
 
-                product.quantity -= self.quantity
-                product.save(update_fields=['quantity', 'new_price', 'discount_end_at', 'updated_at'])
+    def __str__(self):
+        return f"{self.id} {self.quantity} x {self.product_id} - {self.status}"
 
-            try:
-                super().save(*args, **kwargs)
-            except IntegrityError as e:
-                if 'order_number' in str(e):
-                    self.order_number = self._generate_order_number()
-                    super().save(*args, **kwargs)
-                else:
-                    raise
 
-    @property
-    def monthly_sales(self):
-        """Calculate total sales for the month of this order"""
-        if self.order_status == 'Completed':
-            return OrderProduct.objects.filter(
-                shop=self.shop,
-                order_status='Completed',
-                order_date__year=self.order_date.year,
-                order_date__month=self.order_date.month
-            ).aggregate(total=models.Sum('order_total'))['total'] or 0
-        return 0
+class SalesRollup(models.Model):
+    """
+    Completed sales per owner and period, incremented in the transaction
+    that completes an order. See shops.sales.
+    """
+    order_count = models.IntegerField(default=0)
+    units = models.IntegerField(default=0)
+    revenue = models.DecimalField(max_digits=14, decimal_places=2, default=0)
 
-    @property
-    def total(self):
-        return self.unit_price * self.quantity
\ No newline at end of file
+    class Meta:
+        abstract = True
+
+class ShopSalesDaily(SalesRollup):
+    shop = models.ForeignKey(Shop, on_delete=models.CASCADE, related_name='sales_daily')
+    day = models.DateField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['shop', 'day'], name='shop_sales_daily_unique'),
+        ]
+
+class ShopSalesMonthly(SalesRollup):
+    shop = models.ForeignKey(Shop, on_delete=models.CASCADE, related_name='sales_monthly')
+    month = models.DateField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['shop', 'month'], name='shop_sales_monthly_unique'),
+        ]
+
+class ProductSalesDaily(SalesRollup):
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='sales_daily')
+    day = models.DateField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['product', 'day'], name='product_sales_daily_unique'),
+        ]
+
+class ProductSalesMonthly(SalesRollup):
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='sales_monthly')
+    month = models.DateField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['product', 'month'], name='product_sales_monthly_unique'),
+        ]
+
+
+class OrderEvent(models.Model):
+    """
+    Append-only log of order changes, written in the transaction that makes
+    the change; (xact_id, id) orders the feed. See shops.events.
+    """
+    CREATED = 'created'
+    STATUS_CHANGED = 'status_changed'
+    DELETED = 'deleted'
+    EVENT_CHOICES = [
+        (CREATED, 'Created'),
+        (STATUS_CHANGED, 'Status changed'),
+        (DELETED, 'Deleted'),
+    ]
+
+    id = models.BigAutoField(primary_key=True)
+    # Neither is enforced: events outlive deleted orders and shops, and
+    # deleting a shop cascades to its orders, which log deleted events
+    shop = models.ForeignKey(Shop, on_delete=models.DO_NOTHING, db_constraint=False, related_name='order_events')
+    order_id = models.CharField(max_length=255)
+    event_type = models.CharField(max_length=14, choices=EVENT_CHOICES)
+    from_status = models.CharField(max_length=11, blank=True, null=True)
+    to_status = models.CharField(max_length=11, blank=True, null=True)
+    payload = models.JSONField(default=dict, encoder=DjangoJSONEncoder)
+    created_at = models.DateTimeField(auto_now_add=True)
+    # Id of the writing transaction, set by the database
+    xact_id = models.BigIntegerField(db_default=RawSQL('pg_current_xact_id()::text::bigint', []), editable=False)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['shop', 'xact_id', 'id']),
+        ]
+
+    def __str__(self):
+        return f"{self.id} {self.event_type} {self.order_id}"
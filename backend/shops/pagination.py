@@ -0,0 +1,152 @@
+import base64
+import json
+from decimal import Decimal, InvalidOperation
+from functools import reduce
+
+from django.core.exceptions import FieldDoesNotExist, ValidationError as DjangoValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+from .filters import ORDER_ORDERINGS, PRODUCT_ORDERINGS
+
+
+class KeysetPagination(BasePagination):
+    """
+    Cursor pagination keyed on the columns in `ordering`.
+
+    The last primary key is always part of `ordering`, so every position is
+    unique and the next page is a plain indexed range scan, no matter how
+    deep the client goes. Pagination is opt-in: a request without `cursor`
+    or `page_size` gets the full, unpaginated list like before.
+    Example: ?page_size=50  ->  {"next": "...?cursor=...", "results": [...]}
+
+    `ordering_options` maps values of ?ordering= to alternative orderings.
+    """
+    ordering = ('-created_at', '-id')
+    ordering_options = {}
+    ordering_query_param = 'ordering'
+    page_size = 50
+    max_page_size = 200
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'page_size'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        params = request.query_params
+        if self.cursor_query_param not in params and self.page_size_query_param not in params:
+            return None
+
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        self.ordering = self.ordering_options.get(params.get(self.ordering_query_param), self.ordering)
+        queryset = queryset.order_by(*self.ordering)
+
+        cursor = params.get(self.cursor_query_param)
+        if cursor:
+            # filter() prepares the values for their columns, which rejects
+            # some that decoded fine
+            try:
+                position = self.decode_cursor(queryset.model, cursor)
+                queryset = queryset.filter(self.get_cursor_filter(position))
+            except (TypeError, ValueError, InvalidOperation, DjangoValidationError):
+                raise NotFound('Invalid cursor.')
+
+        # Fetch one extra row to know whether a next page exists
+        page = list(queryset[:self.page_size + 1])
+        self.has_next = len(page) > self.page_size
+        page = page[:self.page_size]
+        self.last_position = self.get_position(page[-1]) if page else None
+        return page
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_next_link(),
+            'results': data,
+        })
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
+
+    def get_page_size(self, request):
+        try:
+            page_size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        return max(1, min(page_size, self.max_page_size))
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        url = self.request.build_absolute_uri()
+        url = replace_query_param(url, self.page_size_query_param, self.page_size)
+        return replace_query_param(url, self.cursor_query_param, self.encode_cursor(self.last_position))
+
+    def get_position(self, instance):
+        return [getattr(instance, field.lstrip('-')) for field in self.ordering]
+
+    def get_cursor_filter(self, position):
+        """
+        Build the row-value comparison "after `position`" as OR-ed prefixes:
+        (a < x) OR (a = x AND b < y) OR ... for descending columns.
+        """
+        clauses = []
+        for index, field in enumerate(self.ordering):
+            name = field.lstrip('-')
+            lookup = 'lt' if field.startswith('-') else 'gt'
+            equal = {f.lstrip('-'): position[i] for i, f in enumerate(self.ordering[:index])}
+            clauses.append(Q(**equal, **{f'{name}__{lookup}': position[index]}))
+        return reduce(lambda a, b: a | b, clauses)
+
+    def encode_cursor(self, position):
+        values = [
+            value.isoformat() if hasattr(value, 'isoformat') else str(value) if isinstance(value, Decimal) else value
+            for value in position
+        ]
+        return base64.urlsafe_b64encode(json.dumps(values).encode()).decode()
+
+    def decode_cursor(self, model, cursor):
+        """The position in `cursor`; raises ValueError or ValidationError if malformed"""
+        values = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        if not isinstance(values, list) or len(values) != len(self.ordering):
+            raise ValueError
+        return [self.to_python(model, field, value) for field, value in zip(self.ordering, values)]
+
+    def to_python(self, model, field, value):
+        try:
+            return model._meta.get_field(field.lstrip('-')).to_python(value)
+        except FieldDoesNotExist:
+            # Annotations such as a search rank travel as plain JSON values,
+            # decimals such as an effective price as strings
+            if isinstance(value, str):
+                return Decimal(value)
+            if not isinstance(value, (int, float)):
+                raise ValueError
+            return value
+
+
+class ProductPagination(KeysetPagination):
+    ordering = ('-created_at', '-id')
+    ordering_options = PRODUCT_ORDERINGS
+
+
+class ShopPagination(KeysetPagination):
+    ordering = ('-created_at', '-id')
+
+
+class ProductSearchPagination(KeysetPagination):
+    ordering = ('-rank', '-id')
+    ordering_options = PRODUCT_ORDERINGS
+
+
+class OrderPagination(KeysetPagination):
+    ordering = ('-order_date', '-id')
+    ordering_options = ORDER_ORDERINGS
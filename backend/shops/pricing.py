@@ -0,0 +1,34 @@
+from decimal import Decimal
+
+from django.db.models import F
+from django.db.models.functions import Now, Round
+
+from .cache import purge_tags
+from .discounts import schedule_expiry
+
+
+def apply_bulk_discount(queryset, percent_off, discount_end_at):
+    """
+    Set new_price = price × (1 - percent_off / 100) until `discount_end_at`
+    on every product in `queryset` with a single UPDATE.
+    """
+    factor = (Decimal(100) - Decimal(percent_off)) / Decimal(100)
+    updated = _bulk_update(queryset, new_price=Round(F('price') * factor, 2), discount_end_at=discount_end_at)
+    if updated:
+        schedule_expiry(discount_end_at)
+    return updated
+
+
+def clear_bulk_discount(queryset):
+    """End the discount of every product in `queryset` with a single UPDATE"""
+    return _bulk_update(queryset, new_price=0, discount_end_at=None)
+
+
+def _bulk_update(queryset, **values):
+    # update() bypasses Product.save() and its signals: bump updated_at so
+    # fragments and validators move, and purge the cached lists per shop and
+    # the product collection, whose price filters match other rows now
+    shop_ids = list(queryset.order_by().values_list('shop_id', flat=True).distinct())
+    updated = queryset.update(updated_at=Now(), **values)
+    purge_tags([*(f"shop:{shop_id}" for shop_id in shop_ids), 'products'])
+    return updated
@@ -0,0 +1,39 @@
+from django.db.models import Count, F, IntegerField, OuterRef, Q, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .cache import purge_tags
+
+
+def apply_rating(model, pk, rating, sign):
+    """
+    Add (sign=1) or remove (sign=-1) one `rating` from the stored aggregates
+    of the Product or Shop `pk` with a single atomic UPDATE.
+    """
+    histogram = {}
+    if 1 <= rating <= 5:
+        histogram[f'rating_{rating}_count'] = F(f'rating_{rating}_count') + sign
+    model.objects.filter(pk=pk).update(
+        rating_sum=F('rating_sum') + sign * rating,
+        rating_count=F('rating_count') + sign,
+        updated_at=timezone.now(),
+        **histogram,
+    )
+    purge_tags([f"{model._meta.model_name}:{pk}"])
+
+
+def rebuild_rating_aggregates(model, rating_model, related_field):
+    """Recompute every stored aggregate of `model` from `rating_model` rows"""
+    ratings = rating_model.objects.filter(**{related_field: OuterRef('pk')}).order_by().values(related_field)
+
+    def aggregate(expression):
+        return Coalesce(Subquery(ratings.annotate(value=expression).values('value')), Value(0), output_field=IntegerField())
+
+    return model.objects.update(
+        rating_sum=aggregate(Sum('rating')),
+        rating_count=aggregate(Count('pk')),
+        **{
+            f'rating_{stars}_count': aggregate(Count('pk', filter=Q(rating=stars)))
+            for stars in range(1, 6)
+        },
+    )
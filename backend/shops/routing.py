@@ -0,0 +1,6 @@
+from django.urls import path
+from .consumers import OrderEventConsumer, OrderIntakeConsumer
+websocket_urlpatterns = [
+    path('ws/order-intake/<str:token>/', OrderIntakeConsumer.as_asgi()),
+    path('ws/order-events/', OrderEventConsumer.as_asgi()),
+]
@@ -0,0 +1,97 @@
+from django.db import connection
+from django.utils import timezone
+
+from .models import OrderProduct, ShopSalesDaily, ShopSalesMonthly, ProductSalesDaily, ProductSalesMonthly
+
+# Rollup model, the order field it groups by and its period column
+ROLLUPS = [
+    (ShopSalesDaily, 'shop', 'day'),
+    (ShopSalesMonthly, 'shop', 'month'),
+    (ProductSalesDaily, 'product', 'day'),
+    (ProductSalesMonthly, 'product', 'month'),
+]
+
+
+def sales_row(order):
+    return (order.shop_id, order.product_id, order.order_date, order.quantity, order.order_total)
+
+
+def record_sales(rows, sign=1, owners=('shop', 'product')):
+    """
+    Add (sign=1) or remove (sign=-1) completed orders from the rollups of
+    `owners` with one statement per table.
+
+    `rows` are (shop_id, product_id, order_date, quantity, order_total)
+    tuples; periods follow the current time zone like __month lookups.
+    Removal only updates existing rows: a missing row belongs to an owner
+    that is being deleted and must not be created again.
+    """
+    rollups = [rollup for rollup in ROLLUPS if rollup[1] in owners]
+    totals = {rollup: {} for rollup in rollups}
+    for shop_id, product_id, order_date, quantity, order_total in rows:
+        day = timezone.localtime(order_date).date()
+        periods = {'day': day, 'month': day.replace(day=1)}
+        row_owners = {'shop': shop_id, 'product': product_id}
+        for rollup in rollups:
+            _, owner, period = rollup
+            key = (row_owners[owner], periods[period])
+            count, units, revenue = totals[rollup].get(key, (0, 0, 0))
+            totals[rollup][key] = (count + sign, units + sign * quantity, revenue + sign * order_total)
+
+    with connection.cursor() as cursor:
+        for (model, owner, period), groups in totals.items():
+            if not groups:
+                continue
+            table = model._meta.db_table
+            owner_column = model._meta.get_field(owner).column
+            if sign < 0:
+                keys, changes = zip(*groups.items())
+                cursor.execute(f"""
+                    UPDATE {table} AS t SET
+                        order_count = t.order_count + c.order_count,
+                        units = t.units + c.units,
+                        revenue = t.revenue + c.revenue
+                    FROM unnest(%s::varchar[], %s::date[], %s::integer[], %s::integer[], %s::numeric[])
+                        AS c(owner, period, order_count, units, revenue)
+                    WHERE t.{owner_column} = c.owner AND t.{period} = c.period
+                """, [list(column) for column in (*zip(*keys), *zip(*changes))])
+                continue
+            values = ', '.join(['(%s, %s, %s, %s, %s)'] * len(groups))
+            cursor.execute(f"""
+                INSERT INTO {table} ({owner_column}, {period}, order_count, units, revenue)
+                VALUES {values}
+                ON CONFLICT ({owner_column}, {period}) DO UPDATE SET
+                    order_count = {table}.order_count + EXCLUDED.order_count,
+                    units = {table}.units + EXCLUDED.units,
+                    revenue = {table}.revenue + EXCLUDED.revenue
+            """, [value for key, total in groups.items() for value in (*key, *total)])
+
+
+def rebuild_sales_rollups(order_model=OrderProduct, rollups=ROLLUPS):
+    """
+    Recompute every rollup from the completed orders. Migrations pass their
+    historical models as `order_model` and the (model, owner, period)
+    `rollups`.
+    """
+    orders = order_model._meta
+    tz = timezone.get_current_timezone_name()
+    periods = {
+        'day': "(order_date AT TIME ZONE %s)::date",
+        'month': "date_trunc('month', order_date AT TIME ZONE %s)::date",
+    }
+    rows = 0
+    with connection.cursor() as cursor:
+        for model, owner, period in rollups:
+            table = model._meta.db_table
+            owner_column = model._meta.get_field(owner).column
+            order_column = orders.get_field(owner).column
+            cursor.execute(f"DELETE FROM {table}")
+            cursor.execute(f"""
+                INSERT INTO {table} ({owner_column}, {period}, order_count, units, revenue)
+                SELECT {order_column}, {periods[period]}, count(*), sum(quantity), sum(order_total)
+                FROM {orders.db_table}
+                WHERE order_status = %s
+                GROUP BY 1, 2
+            """, [tz, OrderProduct.COMPLETED])
+            rows += cursor.rowcount
+    return rows
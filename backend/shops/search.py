@@ -0,0 +1,132 @@
+import threading
+import time
+from collections import OrderedDict
+
+from django.contrib.postgres.search import SearchQuery, SearchRank, TrigramSimilarity
+from django.db import connection
+from django.db.models import F, Q, Value, Case, When, BooleanField, CharField, FloatField
+from django.db.models.functions import Cast, Upper
+
+from .models import Shop, Product, ProductCategory
+
+# Text search configuration used both for the stored vectors and the queries
+SEARCH_CONFIG = 'english'
+
+
+def refresh_search_vectors(queryset):
+    """
+    Rebuild Product.search_vector for every product in `queryset` with one
+    set-based UPDATE.
+
+    Weights: A = product name, B = shop and category names,
+    C = description, D = property values.
+    """
+    model = queryset.model
+    shop_field = model._meta.get_field('shop_id')
+    category_field = model._meta.get_field('category')
+    through = category_field.remote_field.through._meta
+    product_column = through.get_field(category_field.m2m_field_name()).column
+    category_column = through.get_field(category_field.m2m_reverse_field_name()).column
+
+    ids_sql, params = queryset.order_by().values('pk').query.sql_with_params()
+    sql = f"""
+        UPDATE {model._meta.db_table} AS p SET search_vector =
+            setweight(to_tsvector(%s::regconfig, coalesce(p.name, '')), 'A') ||
+            setweight(to_tsvector(%s::regconfig, concat_ws(' ', s.name, (
+                SELECT string_agg(c.name, ' ')
+                FROM {through.db_table} pc
+                JOIN {category_field.related_model._meta.db_table} c ON c.id = pc.{category_column}
+                WHERE pc.{product_column} = p.id
+            ))), 'B') ||
+            setweight(to_tsvector(%s::regconfig, coalesce(p.description, '')), 'C') ||
+            setweight(to_tsvector(%s::regconfig, coalesce((
+                SELECT string_agg(prop ->> 'value', ' ') FROM unnest(p.properties) AS prop
+            ), '')), 'D')
+        FROM {shop_field.related_model._meta.db_table} s
+        WHERE s.id = p.{shop_field.column} AND p.id IN ({ids_sql})
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(sql, [SEARCH_CONFIG] * 4 + list(params))
+        return cursor.rowcount
+
+
+def search_products(queryset, keyword):
+    """Filter `queryset` to products matching `keyword`, best match first"""
+    query = SearchQuery(keyword, config=SEARCH_CONFIG, search_type='websearch')
+    # ts_rank returns real; as double precision the keyset cursor carries
+    # the exact value and rows tied on rank are paged without gaps or repeats
+    return queryset.filter(search_vector=query).annotate(
+        rank=Cast(SearchRank(F('search_vector'), query), FloatField()),
+    ).order_by('-rank', '-id')
+
+
+class SuggestionCache:
+    """Small thread-safe LRU with a TTL, local to the worker process"""
+
+    def __init__(self, maxsize=2048, ttl=60):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+suggestion_cache = SuggestionCache()
+
+
+def _name_suggestions(queryset, kind, fragment, limit):
+    # Matching on UPPER(name) lets both the prefix LIKE and the % similarity
+    # operator use the same trigram index; prefix hits rank first
+    return queryset.annotate(upper_name=Upper('name')).filter(
+        Q(upper_name__startswith=fragment.upper()) | Q(upper_name__trigram_similar=fragment),
+    ).annotate(
+        kind=Value(kind, output_field=CharField()),
+        is_prefix=Case(When(upper_name__startswith=fragment.upper(), then=True), default=False, output_field=BooleanField()),
+        similarity=TrigramSimilarity('upper_name', fragment),
+    ).order_by('-is_prefix', '-similarity', 'name').values_list('kind', 'name', 'is_prefix', 'similarity').distinct()[:limit]
+
+
+def suggest(fragment, limit=8):
+    """
+    Top `limit` product, shop and category names for a prefix or misspelled
+    fragment, fetched in one UNION query and memoised per process.
+    """
+    fragment = ' '.join(fragment.lower().split())
+    key = (fragment, limit)
+    suggestions = suggestion_cache.get(key)
+    if suggestions is not None:
+        return suggestions
+
+    products = _name_suggestions(Product.objects.all(), 'products', fragment, limit)
+    shops = _name_suggestions(Shop.objects.all(), 'shops', fragment, limit)
+    categories = _name_suggestions(ProductCategory.objects.all(), 'categories', fragment, limit)
+
+    suggestions = {'products': [], 'shops': [], 'categories': []}
+    for kind, name, is_prefix, similarity in products.union(shops, categories, all=True):
+        suggestions[kind].append((not is_prefix, -similarity, name))
+    suggestions = {kind: [name for *_, name in sorted(rows)] for kind, rows in suggestions.items()}
+
+    suggestion_cache.set(key, suggestions)
+    return suggestions
@@ -1,10 +1,16 @@
+from datetime import timedelta
 from decimal import Decimal
+from functools import lru_cache
 from itertools import count
 
+from django.utils import timezone
 from rest_framework import serializers
 
+from shops.analytics import ANALYTICS_INTERVALS
+from shops.cache import FRAGMENT_TIMEOUT, FragmentCacheMixin, FragmentCacheListSerializer
+
 from customers.serializers import GuestUserSerializer
-from shops.models import ProductCategory, ProductProperty, Shop, Product, ProductImage, OrderProduct
+from shops.models import ProductCategory, ProductProperty, Shop, Product, ProductImage, OrderProduct, StockHold, OrderIntake
 
 class ProductCategorySerializer(serializers.ModelSerializer):
     class Meta:
@@ -37,8 +43,9 @@ class ProductPropertySerializer(serializers.ModelSerializer):
             raise serializers.ValidationError("Values list cannot be empty")
         return cleaned_values
 
-class ShopSerializer(serializers.ModelSerializer):
+class ShopSerializer(FragmentCacheMixin, serializers.ModelSerializer):
     address = serializers.SerializerMethodField()
+    average_rating = serializers.ReadOnlyField()
 
     class Meta:
         model = Shop
@@ -49,6 +56,7 @@ class ShopSerializer(serializers.ModelSerializer):
         # )
         fields = "__all__"
         read_only_fields = ('id',)
+        list_serializer_class = FragmentCacheListSerializer
 
     def get_address(self, obj):
         # Build address string, filtering out None/empty values
@@ -70,7 +78,7 @@ class ProductImageSerializer(serializers.ModelSerializer):
         fields = "__all__"
 
 
-class ProductSerializer(serializers.ModelSerializer):
+class ProductSerializer(FragmentCacheMixin, serializers.ModelSerializer):
     images = ProductImageSerializer(many=True, read_only=True)
     shop_name = serializers.SerializerMethodField()
     shop_address = serializers.SerializerMethodField()
@@ -82,21 +90,44 @@ class ProductSerializer(serializers.ModelSerializer):
     properties = serializers.ListField(child=serializers.DictField(), required=False)
     category = serializers.PrimaryKeyRelatedField(many=True, queryset=ProductCategory.objects.all())
     category_names = serializers.SerializerMethodField()
+    average_rating = serializers.ReadOnlyField()
+    available_quantity = serializers.SerializerMethodField()
+    # Holds change the stock for sale without touching updated_at
+    live_fields = ('available_quantity',)
     
     class Meta:
         model = Product
-        fields = "__all__"
+        exclude = ('search_vector', 'sale_price')
         read_only_fields = ('id',)
+        list_serializer_class = FragmentCacheListSerializer
+
+    def fragment_timeout(self, instance):
+        # Discounted prices change on their own when the discount ends
+        now = timezone.now()
+        if instance.discount_end_at and instance.discount_end_at > now:
+            remaining = (instance.discount_end_at - now).total_seconds()
+            return max(1, min(FRAGMENT_TIMEOUT, int(remaining)))
+        return FRAGMENT_TIMEOUT
+
     def get_category_names(self, obj):
-        return obj.category.values_list('name', flat=True)
+        # Iterate .all() so a prefetched category list is reused
+        return [category.name for category in obj.category.all()]
     def get_new_price(self, obj):
         """Return 0 if discount is expired, otherwise return actual new_price"""
+        # Annotated by Product.objects.with_effective_price()
+        if hasattr(obj, 'discount_active'):
+            return float(obj.new_price) if obj.discount_active else 0
         if obj.is_discount_expired():
             return 0
         return float(obj.new_price) if obj.new_price else 0
     def get_shop_name(self, obj):
         return obj.shop_id.name
     def get_primary_image(self, obj):
+        # Annotated by Product.objects.for_listing()
+        if hasattr(obj, 'primary_image_media'):
+            if not obj.primary_image_media:
+                return None
+            return ProductImage._meta.get_field('media').storage.url(obj.primary_image_media)
         primary_image = obj.images.filter(is_primary=True).first()
         if primary_image and primary_image.media:
             return primary_image.media.url
@@ -119,16 +150,27 @@ class ProductSerializer(serializers.ModelSerializer):
         return ", ".join(filter(None, address_parts))
 
     def get_discount(self, obj):
+        if hasattr(obj, 'discount_amount'):
+            return float(obj.discount_amount)
         # Use new_price field and check if discount is still valid
         if obj.new_price and obj.new_price > 0 and not obj.is_discount_expired():
             if obj.price > obj.new_price:
                 return float(obj.price - obj.new_price)
         return 0
 
+    def get_available_quantity(self, obj):
+        # Annotated by Product.objects.for_listing()
+        if hasattr(obj, 'available_quantity'):
+            return obj.available_quantity
+        held = StockHold.objects.held_quantities([obj.pk]).get(obj.pk, 0)
+        return max(obj.quantity - held, 0)
+
     def get_shop_city(self, obj):
         return obj.shop_id.city
 
     def get_current_price(self, obj):
+        if hasattr(obj, 'effective_price'):
+            return float(obj.effective_price)
         return float(obj.current_price)
     
     def create(self, validated_data):
@@ -160,8 +202,60 @@ class ProductSerializer(serializers.ModelSerializer):
         return instance
 
 
+class ProductImportSerializer(serializers.ModelSerializer):
+    """One row of a bulk product import; categories are given by name"""
+    categories = serializers.ListField(child=serializers.CharField(), required=False, default=list)
+    properties = serializers.ListField(child=serializers.DictField(), required=False, default=list)
+
+    class Meta:
+        model = Product
+        fields = (
+            'name', 'description', 'quantity', 'price', 'new_price', 'discount_end_at',
+            'currency_unit', 'condition', 'warranty', 'delivery_term', 'refund',
+            'refund_policy', 'properties', 'categories',
+        )
+
+
+class BulkPriceSerializer(serializers.Serializer):
+    """
+    Bulk discount request. Products are selected by `products` (ids) and/or
+    `filters` (the product list filters, e.g. {"category": "cat-1"}).
+    """
+    DISCOUNT = 'discount'
+    CLEAR = 'clear'
+
+    action = serializers.ChoiceField(choices=[DISCOUNT, CLEAR])
+    products = serializers.ListField(child=serializers.CharField(), required=False)
+    filters = serializers.DictField(required=False, default=dict)
+    percent_off = serializers.DecimalField(max_digits=5, decimal_places=2, min_value=Decimal('0.01'), max_value=Decimal('99.99'), required=False)
+    discount_end_at = serializers.DateTimeField(required=False)
+    dry_run = serializers.BooleanField(default=False)
+
+    def validate(self, attrs):
+        if attrs['action'] == self.DISCOUNT:
+            if 'percent_off' not in attrs:
+                raise serializers.ValidationError({'percent_off': 'Required for a discount.'})
+            if not attrs.get('discount_end_at') or attrs['discount_end_at'] <= timezone.now():
+                raise serializers.ValidationError({'discount_end_at': 'Must be in the future.'})
+        if 'products' not in attrs and not attrs['filters']:
+            raise serializers.ValidationError('Select products with "products" or "filters".')
+        return attrs
+
+
 # Orderserializer
 
+@lru_cache(maxsize=None)
+def product_property_fields():
+    """(name, label) of the product fields summarised on an order, built once"""
+    exclude_fields = ['id','shop_id', 'price', 'new_price', 'updated_at', 'discount_end_at', 'currency_unit', 'created_at']
+    return tuple(
+        # Capitalize field name nicely
+        (f.name, f.name.replace('_', ' ').title())
+        for f in Product._meta.fields
+        if f.editable and not f.name.startswith('_') and f.name not in exclude_fields
+    )
+
+
 class OrderSerializer(serializers.ModelSerializer):
     shop_name = serializers.SerializerMethodField()
     product_name = serializers.SerializerMethodField()
@@ -206,18 +300,10 @@ class OrderSerializer(serializers.ModelSerializer):
         return ", ".join(filter(None, address))
 
     def get_product_property(self, obj):
-        exclude_fields = ['id','shop_id', 'price', 'new_price', 'updated_at', 'discount_end_at', 'currency_unit', 'created_at']
-        fields = [
-            f for f in obj.product._meta.fields
-            if not f.name.startswith('_') and f.name not in exclude_fields
-        ]
-
         properties = []
-        for field in fields:
-            value = getattr(obj.product, field.name)
+        for name, label in product_property_fields():
+            value = getattr(obj.product, name)
             if value:
-                # Capitalize field name nicely
-                label = field.name.replace('_', ' ').title()
                 properties.append(f"{label}: {value}")
 
         return "\n".join(properties)
@@ -244,3 +330,50 @@ class OrderSerializer(serializers.ModelSerializer):
     #     return 0
 
 
+class CheckoutItemSerializer(serializers.Serializer):
+    product = serializers.CharField()
+    quantity = serializers.IntegerField(min_value=1)
+
+
+class CheckoutSerializer(serializers.Serializer):
+    items = CheckoutItemSerializer(many=True, allow_empty=False, max_length=100)
+    note = serializers.CharField(required=False, allow_blank=True, allow_null=True)
+
+
+class StockHoldRequestSerializer(serializers.Serializer):
+    items = CheckoutItemSerializer(many=True, allow_empty=False, max_length=100)
+
+
+class StockHoldSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = StockHold
+        fields = ('id', 'product', 'quantity', 'expires_at')
+
+
+class OrderIntakeSerializer(serializers.ModelSerializer):
+    quantity = serializers.IntegerField(min_value=1)
+
+    class Meta:
+        model = OrderIntake
+        fields = ('id', 'product', 'quantity', 'note', 'status', 'order', 'error', 'created_at', 'processed_at')
+        read_only_fields = ('id', 'status', 'order', 'error', 'created_at', 'processed_at')
+
+
+class OrderBulkStatusSerializer(serializers.Serializer):
+    orders = serializers.ListField(child=serializers.CharField(), allow_empty=False, max_length=1000)
+    order_status = serializers.ChoiceField(choices=OrderProduct.STATUS_CHOICES)
+
+
+class ShopAnalyticsQuerySerializer(serializers.Serializer):
+    start = serializers.DateField(required=False)
+    end = serializers.DateField(required=False)
+    interval = serializers.ChoiceField(choices=ANALYTICS_INTERVALS, default='day')
+
+    def validate(self, attrs):
+        attrs.setdefault('end', timezone.localdate())
+        attrs.setdefault('start', attrs['end'] - timedelta(days=29))
+        if attrs['start'] > attrs['end']:
+            raise serializers.ValidationError({'start': 'Must not be after end.'})
+        if (attrs['end'] - attrs['start']).days > 366 * 2:
+            raise serializers.ValidationError('The range may span at most two years.')
+        return attrs
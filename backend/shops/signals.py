@@ -0,0 +1,220 @@
+from django.db.models import QuerySet
+from django.db.models.signals import pre_save, post_save, pre_delete, post_delete, m2m_changed
+from django.dispatch import receiver
+from django.utils import timezone
+
+from .cache import instance_tag, purge_tags, touch
+from .discounts import schedule_expiry
+from .events import order_event, record_order_events
+from .models import Shop, Product, ProductCategory, ProductImage, ProductProperty, ProductRating, ShopRating, OrderProduct, OrderEvent
+from .ratings import apply_rating
+from .sales import record_sales, sales_row
+from .search import refresh_search_vectors
+
+
+# Keep Product.search_vector in sync with everything it is built from
+@receiver(post_save, sender=Product)
+def refresh_product_search_vector(sender, instance, **kwargs):
+    refresh_search_vectors(Product.objects.filter(pk=instance.pk))
+
+@receiver(m2m_changed, sender=Product.category.through)
+def refresh_product_categories_search_vector(sender, instance, action, reverse, pk_set, **kwargs):
+    if reverse and action == 'pre_clear':
+        # category.products.clear() does not report which products it touched
+        instance._cleared_product_ids = list(instance.products.values_list('pk', flat=True))
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    if not reverse:
+        product_ids = [instance.pk]
+    elif action == 'post_clear':
+        product_ids = getattr(instance, '_cleared_product_ids', [])
+    else:
+        product_ids = pk_set
+    refresh_search_vectors(Product.objects.filter(pk__in=product_ids))
+
+# Shop fields copied into product search vectors and fragments; a Shop save
+# only rewrites its products when one of them changed
+SHOP_PRODUCT_FIELDS = ('name', 'street', 'province', 'city', 'state', 'zipcode', 'country')
+
+@receiver(pre_save, sender=Shop)
+def remember_changed_shop_fields(sender, instance, update_fields=None, **kwargs):
+    instance._changed_product_fields = set()
+    fields = [field for field in SHOP_PRODUCT_FIELDS if update_fields is None or field in update_fields]
+    if instance._state.adding or not fields:
+        return
+    previous = Shop.objects.filter(pk=instance.pk).values(*fields).first()
+    if previous:
+        instance._changed_product_fields = {field for field in fields if previous[field] != getattr(instance, field)}
+
+@receiver(post_save, sender=Shop)
+def refresh_shop_products_search_vector(sender, instance, created, **kwargs):
+    # Only the shop name is part of the search vector
+    if not created and 'name' in getattr(instance, '_changed_product_fields', ()):
+        refresh_search_vectors(Product.objects.filter(shop_id=instance))
+        purge_tags(['products'])
+
+# Products and shops only embed a category's name
+@receiver(pre_save, sender=ProductCategory)
+def remember_category_rename(sender, instance, update_fields=None, **kwargs):
+    instance._name_changed = False
+    if instance._state.adding or (update_fields is not None and 'name' not in update_fields):
+        return
+    previous = ProductCategory.objects.filter(pk=instance.pk).values_list('name', flat=True).first()
+    instance._name_changed = previous is not None and previous != instance.name
+
+@receiver(post_save, sender=ProductCategory)
+def refresh_category_products_search_vector(sender, instance, created, **kwargs):
+    if not created and getattr(instance, '_name_changed', False):
+        refresh_search_vectors(Product.objects.filter(category=instance))
+        purge_tags(['products'])
+
+
+# Keep the denormalized rating aggregates of products and shops up to date
+RATED_OBJECTS = {
+    ProductRating: (Product, 'product_id'),
+    ShopRating: (Shop, 'shop_id'),
+}
+
+@receiver(pre_save, sender=ProductRating)
+@receiver(pre_save, sender=ShopRating)
+def remember_previous_rating(sender, instance, **kwargs):
+    instance._previous_rating = None
+    if not instance._state.adding:
+        rated_field = RATED_OBJECTS[sender][1]
+        instance._previous_rating = sender.objects.filter(pk=instance.pk).values_list(rated_field, 'rating').first()
+
+@receiver(post_save, sender=ProductRating)
+@receiver(post_save, sender=ShopRating)
+def add_rating(sender, instance, **kwargs):
+    model, rated_field = RATED_OBJECTS[sender]
+    current = (getattr(instance, rated_field), instance.rating)
+    previous = getattr(instance, '_previous_rating', None)
+    if previous == current:
+        return
+    if previous:
+        apply_rating(model, previous[0], previous[1], -1)
+    apply_rating(model, current[0], current[1], 1)
+
+@receiver(post_delete, sender=ProductRating)
+@receiver(post_delete, sender=ShopRating)
+def remove_rating(sender, instance, **kwargs):
+    model, rated_field = RATED_OBJECTS[sender]
+    apply_rating(model, getattr(instance, rated_field), instance.rating, -1)
+
+
+# Cached product and shop fragments are keyed by updated_at; when something
+# they embed changes, touch the owning rows so their fragments are retired.
+# Saving a Product or Shop itself already moves its updated_at.
+@receiver(post_save, sender=ProductImage)
+@receiver(post_delete, sender=ProductImage)
+def invalidate_product_image_fragments(sender, instance, **kwargs):
+    touch(Product.objects.filter(pk=instance.product_id_id))
+
+@receiver(m2m_changed, sender=Product.category.through)
+def invalidate_product_category_fragments(sender, instance, action, reverse, pk_set, **kwargs):
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    if not reverse:
+        touch(Product.objects.filter(pk=instance.pk))
+    elif action == 'post_clear':
+        touch(Product.objects.filter(pk__in=getattr(instance, '_cleared_product_ids', [])))
+    else:
+        touch(Product.objects.filter(pk__in=pk_set))
+    # Category filters match a different set of products
+    purge_tags(['products'])
+
+@receiver(m2m_changed, sender=Shop.category.through)
+def invalidate_shop_category_fragments(sender, instance, action, reverse, pk_set, **kwargs):
+    if reverse and action == 'pre_clear':
+        instance._cleared_shop_ids = list(instance.shops.values_list('pk', flat=True))
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    if not reverse:
+        touch(Shop.objects.filter(pk=instance.pk))
+    elif action == 'post_clear':
+        touch(Shop.objects.filter(pk__in=getattr(instance, '_cleared_shop_ids', [])))
+    else:
+        touch(Shop.objects.filter(pk__in=pk_set))
+
+@receiver(post_save, sender=Shop)
+def invalidate_shop_product_fragments(sender, instance, created, **kwargs):
+    # Product fragments embed the shop name and address
+    if not created and getattr(instance, '_changed_product_fields', None):
+        touch(Product.objects.filter(shop_id=instance))
+
+@receiver(post_save, sender=ProductCategory)
+@receiver(pre_delete, sender=ProductCategory)
+def invalidate_category_fragments(sender, instance, **kwargs):
+    # Saves only matter when they rename the category, deletes always do
+    if kwargs.get('signal') is post_save and not getattr(instance, '_name_changed', False):
+        return
+    touch(Product.objects.filter(category=instance))
+    touch(Shop.objects.filter(category=instance))
+
+
+# Purge the cached public responses that contain a changed catalog row; the
+# collection tag is purged when rows are added or removed, and on any product
+# change, since filtered and search lists may now (not) match it
+CACHE_COLLECTIONS = {
+    Product: 'products',
+    Shop: 'shops',
+    ProductCategory: 'categories',
+    ProductProperty: 'properties',
+}
+
+@receiver(post_save, sender=Product)
+@receiver(post_save, sender=Shop)
+@receiver(post_save, sender=ProductCategory)
+@receiver(post_save, sender=ProductProperty)
+def purge_saved_responses(sender, instance, created, **kwargs):
+    tags = [instance_tag(instance)]
+    if created or sender is Product:
+        tags.append(CACHE_COLLECTIONS[sender])
+    purge_tags(tags)
+
+@receiver(post_delete, sender=Product)
+@receiver(post_delete, sender=Shop)
+@receiver(post_delete, sender=ProductCategory)
+@receiver(post_delete, sender=ProductProperty)
+def purge_deleted_responses(sender, instance, **kwargs):
+    purge_tags([instance_tag(instance), CACHE_COLLECTIONS[sender]])
+
+
+# Wake the discount expiry task when a discount ends
+@receiver(post_save, sender=Product)
+def schedule_discount_expiry(sender, instance, **kwargs):
+    if instance.new_price and instance.discount_end_at and instance.discount_end_at > timezone.now():
+        schedule_expiry(instance.discount_end_at)
+
+
+# Count an order in the sales rollups when it is completed, which is final;
+# OrderProduct.save() leaves the status it replaced in _previous_status
+@receiver(post_save, sender=OrderProduct)
+def add_completed_order_sales(sender, instance, created, **kwargs):
+    previous = None if created else getattr(instance, '_previous_status', None)
+    if instance.order_status == OrderProduct.COMPLETED and previous != OrderProduct.COMPLETED:
+        record_sales([sales_row(instance)])
+
+@receiver(post_delete, sender=OrderProduct)
+def remove_completed_order_sales(sender, instance, origin=None, **kwargs):
+    if instance.order_status != OrderProduct.COMPLETED:
+        return
+    # The rollups of a shop or product being deleted go with it
+    origin_model = origin.model if isinstance(origin, QuerySet) else type(origin)
+    if origin_model is Shop:
+        return
+    owners = ('shop',) if origin_model is Product else ('shop', 'product')
+    record_sales([sales_row(instance)], sign=-1, owners=owners)
+
+
+# Append every order change to the order event log, in the same transaction
+@receiver(post_save, sender=OrderProduct)
+def record_saved_order_event(sender, instance, created, **kwargs):
+    if created:
+        record_order_events([order_event(instance, OrderEvent.CREATED)])
+    elif getattr(instance, '_previous_status', instance.order_status) != instance.order_status:
+        record_order_events([order_event(instance, OrderEvent.STATUS_CHANGED)])
+
+@receiver(post_delete, sender=OrderProduct)
+def record_deleted_order_event(sender, instance, **kwargs):
+    record_order_events([order_event(instance, OrderEvent.DELETED)])
@@ -1,18 +1,47 @@
 # tasks.py
-# tasks.py
 from celery import shared_task
+from django.core.cache import cache
 from django.utils import timezone
-from shops.models import Product
+
+from shops.discounts import SCHEDULE_CACHE_KEY, expire_discounts, schedule_expiry
+from shops.holds import sweep_expired_holds
+from shops.intake import process_intakes, stale_intake_products
+from shops.models import OrderIntake
 
 @shared_task
 def clear_expired_discounts():
-    """Clear expired product discounts"""
-    updated = Product.objects.filter(
-        discount_end_at__lt=timezone.now(),
-        new_price__gt=0
-    ).update(
-        new_price=0,
-        discount_end_at=None
-    )
-    
-    return f'Cleared {updated} expired discounts'
\ No newline at end of file
+    """
+    Clear expired product discounts, then schedule the next run at the next
+    discount_end_at instead of polling. A run woken early by the
+    MAX_EXPIRY_DELAY cap finds nothing due and schedules again.
+    """
+    scheduled = cache.get(SCHEDULE_CACHE_KEY)
+    if scheduled and scheduled <= timezone.now():
+        cache.delete(SCHEDULE_CACHE_KEY)
+    expired, upcoming = expire_discounts()
+    schedule_expiry(upcoming)
+    return f'Cleared {expired} expired discounts'
+
+@shared_task
+def release_expired_holds():
+    """Delete expired stock holds in batches"""
+    return f'Released {sweep_expired_holds()} expired holds'
+
+@shared_task
+def process_order_intake(product_id):
+    """Fulfil the queued order requests of one product"""
+    processed = process_intakes(product_id)
+    if processed is False:
+        return 'Product busy, its current worker drains the queue'
+    # A request queued while this worker held the lock was skipped by its own task
+    if OrderIntake.objects.filter(product_id=product_id, status=OrderIntake.PENDING).exists():
+        process_order_intake.delay(product_id)
+    return f'Processed {len(processed)} order requests'
+
+@shared_task
+def dispatch_stale_intakes():
+    """Re-queue products whose order requests were left Pending"""
+    product_ids = stale_intake_products()
+    for product_id in product_ids:
+        process_order_intake.delay(product_id)
+    return f'Re-dispatched {len(product_ids)} products'
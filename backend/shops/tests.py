@@ -1,3 +1,288 @@
+from datetime import timedelta
+from decimal import Decimal
+from itertools import count
+
+from django.contrib.auth import get_user_model
+from django.core.exceptions import ValidationError
+from django.http import QueryDict
 from django.test import TestCase
+from django.utils import timezone
+from rest_framework.exceptions import NotFound
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from customers.models import GuestUser
+from shops.facets import product_facets
+from shops.filters import filter_products
+from shops.fulfillment import bulk_change_status
+from shops.models import (
+    Shop, Product, OrderProduct, StockHold, ShopSalesDaily, ShopSalesMonthly, ProductSalesDaily, ProductSalesMonthly,
+)
+from shops.pagination import ProductPagination
+
+User = get_user_model()
+sequence = count()
+
+
+def create_shop(**fields):
+    n = next(sequence)
+    user = User.objects.create_user(
+        email=f"shop{n}@example.com", password="password", first_name="Shop", last_name="Owner", role=User.SHOP_ADMIN,
+    )
+    # The account signal has created an empty shop for the admin
+    Shop.objects.filter(shop_account=user).update(
+        name=f"Shop {n}", street="Street 1", zipcode="00100", phone="123", **fields,
+    )
+    return Shop.objects.get(shop_account=user)
+
+
+def create_customer():
+    n = next(sequence)
+    user = User.objects.create_user(
+        email=f"customer{n}@example.com", password="password", first_name="Guest", last_name="User",
+        role=User.GUEST_USER,
+    )
+    GuestUser.objects.filter(user=user).update(phone="123", street="Street 2", city="Helsinki", zipcode="00100")
+    return GuestUser.objects.get(user=user)
+
+
+def create_product(shop, **fields):
+    fields.setdefault('name', f"Product {next(sequence)}")
+    fields.setdefault('price', Decimal('10.00'))
+    fields.setdefault('quantity', 5)
+    return Product.objects.create(shop_id=shop, **fields)
+
+
+def place_order(product, customer, quantity=1, **fields):
+    fields.setdefault('order_number', OrderProduct._generate_order_number())
+    return OrderProduct.objects.create(
+        product=product, shop=product.shop_id, customer=customer, quantity=quantity, **fields,
+    )
+
+
+class OrderStockTest(TestCase):
+    def setUp(self):
+        self.shop = create_shop()
+        self.customer = create_customer()
+
+    def test_order_takes_stock_at_discounted_price(self):
+        product = create_product(
+            self.shop, quantity=5, new_price=Decimal('8.00'), discount_end_at=timezone.now() + timedelta(days=1),
+        )
+
+        order = place_order(product, self.customer, quantity=2)
+
+        product.refresh_from_db()
+        self.assertEqual(product.quantity, 3)
+        self.assertEqual(order.unit_price, Decimal('8.00'))
+        self.assertEqual(order.order_total, Decimal('16.00'))
+
+    def test_overselling_is_rejected(self):
+        product = create_product(self.shop, quantity=2)
+
+        with self.assertRaisesMessage(ValidationError, "Only 2 in stock."):
+            place_order(product, self.customer, quantity=3)
+
+        product.refresh_from_db()
+        self.assertEqual(product.quantity, 2)
+        self.assertFalse(OrderProduct.objects.exists())
+
+    def test_stock_held_for_another_customer_is_not_for_sale(self):
+        product = create_product(self.shop, quantity=3)
+        StockHold.objects.create(
+            product=product, customer=create_customer(), quantity=2, expires_at=timezone.now() + timedelta(minutes=5),
+        )
+
+        with self.assertRaisesMessage(ValidationError, "Only 1 in stock."):
+            place_order(product, self.customer, quantity=2)
+        place_order(product, self.customer, quantity=1)
+
+    def test_missing_customer_is_a_validation_error(self):
+        product = create_product(self.shop)
+
+        with self.assertRaises(ValidationError) as raised:
+            place_order(product, GuestUser(pk='missing'))
+        self.assertIn('customer', raised.exception.message_dict)
+
+    def test_cancelling_restocks(self):
+        product = create_product(self.shop, quantity=5)
+        order = place_order(product, self.customer, quantity=2)
+
+        order.order_status = OrderProduct.CANCELLED
+        order.save()
+
+        product.refresh_from_db()
+        self.assertEqual(product.quantity, 5)
+
+    def test_invalid_status_change_is_rejected(self):
+        order = place_order(create_product(self.shop), self.customer)
+        order.order_status = OrderProduct.CANCELLED
+        order.save()
+
+        order.order_status = OrderProduct.PENDING
+        with self.assertRaisesMessage(ValidationError, "Invalid status change"):
+            order.save()
+
+
+class BulkChangeStatusTest(TestCase):
+    def setUp(self):
+        self.shop = create_shop()
+        self.customer = create_customer()
+        self.product = create_product(self.shop, quantity=10)
+        self.orders = [place_order(self.product, self.customer, quantity=quantity) for quantity in (1, 2, 3)]
+
+    def test_cancel_restocks_each_order_once(self):
+        ids = [order.pk for order in self.orders[:2]]
+
+        results = bulk_change_status(OrderProduct.objects.all(), ids, OrderProduct.CANCELLED)
+        self.assertTrue(all(result['ok'] for result in results))
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.quantity, 7)
+
+        # Cancelled is final: a second cancel fails and restocks nothing
+        results = bulk_change_status(OrderProduct.objects.all(), ids, OrderProduct.CANCELLED)
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.quantity, 7)
+
+    def test_reports_orders_that_cannot_change(self):
+        completed = self.orders[0]
+        completed.order_status = OrderProduct.COMPLETED
+        completed.save()
+
+        results = bulk_change_status(
+            OrderProduct.objects.all(), [completed.pk, self.orders[1].pk, 'missing'], OrderProduct.SHIPPED,
+        )
+
+        self.assertEqual([result['ok'] for result in results], [False, True, False])
+        self.assertEqual(results[0]['error'], "Invalid status change: Completed → Shipped")
+        self.assertEqual(results[2]['error'], "Order not found.")
+
+    def test_other_shops_orders_are_out_of_scope(self):
+        results = bulk_change_status(
+            OrderProduct.objects.filter(shop=create_shop()), [self.orders[0].pk], OrderProduct.CANCELLED,
+        )
+
+        self.assertEqual(results[0]['error'], "Order not found.")
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.quantity, 4)
+
+
+class SalesRollupTest(TestCase):
+    def setUp(self):
+        self.shop = create_shop()
+        self.customer = create_customer()
+        self.product = create_product(self.shop, quantity=20, price=Decimal('5.00'))
+
+    def assertRollups(self, order_count, units, revenue):
+        for model, owner in (
+            (ShopSalesDaily, {'shop': self.shop}), (ShopSalesMonthly, {'shop': self.shop}),
+            (ProductSalesDaily, {'product': self.product}), (ProductSalesMonthly, {'product': self.product}),
+        ):
+            totals = model.objects.filter(**owner).values('order_count', 'units', 'revenue').first()
+            totals = totals or {'order_count': 0, 'units': 0, 'revenue': 0}
+            self.assertEqual(
+                (totals['order_count'], totals['units'], totals['revenue']), (order_count, units, revenue),
+                model.__name__,
+            )
+
+    def test_only_completed_orders_count_once(self):
+        order = place_order(self.product, self.customer, quantity=2)
+        self.assertRollups(0, 0, 0)
+
+        order.order_status = OrderProduct.COMPLETED
+        order.save()
+        self.assertRollups(1, 2, Decimal('10.00'))
+
+        # Saves that do not change the status are not counted again
+        order.note = "Left at the door"
+        order.save(update_fields=['note'])
+        order.save()
+        self.assertRollups(1, 2, Decimal('10.00'))
+
+    def test_bulk_completion_and_deletion(self):
+        orders = [place_order(self.product, self.customer, quantity=quantity) for quantity in (1, 3)]
+
+        bulk_change_status(OrderProduct.objects.all(), [order.pk for order in orders], OrderProduct.COMPLETED)
+        self.assertRollups(2, 4, Decimal('20.00'))
+
+        OrderProduct.objects.get(pk=orders[0].pk).delete()
+        self.assertRollups(1, 3, Decimal('15.00'))
+
+    def test_monthly_sales_of_listed_orders(self):
+        order = place_order(self.product, self.customer, quantity=2)
+        order.order_status = OrderProduct.COMPLETED
+        order.save()
+
+        listed = OrderProduct.objects.for_listing().get(pk=order.pk)
+        self.assertEqual(listed.monthly_sales, Decimal('10.00'))
+
+
+class ProductPriceTest(TestCase):
+    def setUp(self):
+        self.shop = create_shop()
+        self.regular = create_product(self.shop, price=Decimal('30.00'))
+        self.discounted = create_product(
+            self.shop, price=Decimal('30.00'), new_price=Decimal('20.00'),
+            discount_end_at=timezone.now() + timedelta(days=1),
+        )
+        # Ended, but not cleared by the expiry job yet
+        self.ended = create_product(self.shop, price=Decimal('30.00'))
+        Product.objects.filter(pk=self.ended.pk).update(
+            new_price=Decimal('20.00'), discount_end_at=timezone.now() - timedelta(minutes=1),
+        )
+
+    def test_price_filter_uses_the_current_price(self):
+        cheap = filter_products(Product.objects.all(), QueryDict('max_price=25'))
+        self.assertEqual(set(cheap.values_list('pk', flat=True)), {self.discounted.pk})
+
+        full_price = filter_products(Product.objects.all(), QueryDict('min_price=25'))
+        self.assertEqual(set(full_price.values_list('pk', flat=True)), {self.regular.pk, self.ended.pk})
+
+    def test_price_facets_agree_with_the_filter(self):
+        facets = product_facets(Product.objects.all())
+
+        counts = {(bucket['min'], bucket['max']): bucket['count'] for bucket in facets['price']}
+        self.assertEqual(counts, {(10, 25): 1, (25, 50): 2})
+
+    def test_listing_annotations(self):
+        prices = dict(Product.objects.with_effective_price().values_list('pk', 'effective_price'))
+        self.assertEqual(prices[self.discounted.pk], Decimal('20.00'))
+        self.assertEqual(prices[self.ended.pk], Decimal('30.00'))
+
+
+class KeysetPaginationTest(TestCase):
+    def setUp(self):
+        shop = create_shop()
+        # Equal prices and creation times, so only the id breaks the ties
+        self.products = [create_product(shop, price=Decimal(price)) for price in ('5', '5', '5', '7', '7', '9')]
+        Product.objects.update(created_at=timezone.now())
+
+    def paginate(self, params):
+        request = Request(APIRequestFactory().get('/', params))
+        paginator = ProductPagination()
+        page = paginator.paginate_queryset(Product.objects.all(), request)
+        cursor = None
+        if paginator.has_next:
+            cursor = QueryDict(paginator.get_next_link().split('?', 1)[1]).get('cursor')
+        return [product.pk for product in page], cursor
+
+    def walk(self, params):
+        ids, cursor = self.paginate(params)
+        while cursor:
+            page, cursor = self.paginate({**params, 'cursor': cursor})
+            ids += page
+        return ids
+
+    def test_pages_are_stable_across_ties(self):
+        expected = [p.pk for p in sorted(self.products, key=lambda p: (p.price, p.pk))]
+        self.assertEqual(self.walk({'page_size': 2, 'ordering': 'price'}), expected)
+        self.assertEqual(self.walk({'page_size': 4, 'ordering': '-price'}), expected[::-1])
+
+    def test_default_ordering_breaks_ties_on_id(self):
+        expected = sorted((p.pk for p in self.products), reverse=True)
+        self.assertEqual(self.walk({'page_size': 4}), expected)
 
-# Create your tests here.
+    def test_malformed_cursor(self):
+        for cursor in ('not-a-cursor', 'WyJOYU4iLCAieCJd', 'W251bGwsICJ4Il0='):
+            with self.assertRaises(NotFound):
+                self.paginate({'cursor': cursor, 'ordering': 'price'})
@@ -15,11 +15,18 @@ urlpatterns = [
     path('shops/shop-list-view/', views.ShopListView.as_view(), name='shop-list-view'),
     path('shops/shop-list-create/', views.ShopListAndCreateView.as_view(), name='shop-list'),
     path('shops/shop-editor/<str:pk>/', views.ShopEditorView.as_view(), name='shop-editor'),
+    path('shops/shop-analytics/', views.ShopAnalyticsView.as_view(), name='shop-analytics'),
     # product url
     path('shops/product-list-view/', views.ProductListView.as_view(), name='product-list-view'),
     path('shops/product-list-create/', views.ProductListAndCreateView.as_view(), name='product-list'),
     path('shops/product-editor/<str:pk>/', views.ProductEditorView.as_view(), name='product-list'),
+    path('shops/discount-expiry/metrics/', views.DiscountExpiryMetricsView.as_view(), name='discount-expiry-metrics'),
+    path('shops/product-bulk-price/', views.ProductBulkPriceView.as_view(), name='product-bulk-price'),
+    path('shops/product-export/', views.ProductExportView.as_view(), name='product-export'),
+    path('shops/product-import/', views.ProductImportView.as_view(), name='product-import'),
     path('shops/products/search-products/', views.ProductSearchView.as_view(), name='product-list-search'),
+    path('shops/products/facets/', views.ProductFacetView.as_view(), name='product-facets'),
+    path('shops/products/suggest/', views.ProductSuggestionView.as_view(), name='product-suggest'),
     # product image url
     path('shops/product-image-view/', views.ProductImageListView.as_view(), name='product-image-view'),
     path('shops/product-image-create/', views.ProductImageCreateView.as_view(), name='product-image-view'),
@@ -28,4 +35,10 @@ urlpatterns = [
     path('shops/order-list-view/', views.OrderListView.as_view(), name='order-list-view'),
     path('shops/order-create/', views.OrderCreateView.as_view(), name='order-list-view'),
     path('shops/order-editor/<str:pk>/', views.OrderEditorView.as_view(), name='order-list-view'),
+    path('shops/order-events/', views.OrderEventFeedView.as_view(), name='order-events'),
+    path('shops/order-bulk-status/', views.OrderBulkStatusView.as_view(), name='order-bulk-status'),
+    path('shops/checkout/', views.CheckoutView.as_view(), name='checkout'),
+    path('shops/holds/', views.StockHoldView.as_view(), name='stock-holds'),
+    path('shops/order-intake/', views.OrderIntakeView.as_view(), name='order-intake'),
+    path('shops/order-intake/<str:pk>/', views.OrderIntakeDetailView.as_view(), name='order-intake-detail'),
 ]+ static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
\ No newline at end of file
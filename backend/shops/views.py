@@ -1,16 +1,43 @@
-from django.db.models import Q
-from rest_framework import generics
+from django.http import QueryDict
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.shortcuts import get_object_or_404
+from rest_framework import generics, status
+from rest_framework.parsers import MultiPartParser
+from rest_framework.response import Response
+from rest_framework.exceptions import ValidationError
+from rest_framework.views import APIView
 from rest_framework.permissions import IsAuthenticated, AllowAny, IsAdminUser, IsAuthenticatedOrReadOnly
 from rest_framework_simplejwt.authentication import JWTAuthentication
-from .models import Shop, Product, ProductImage, OrderProduct, ProductCategory, ProductProperty
+from core.streaming import StreamingListMixin, streaming_response
+from .pagination import ProductPagination, ProductSearchPagination, ShopPagination, OrderPagination
+from .analytics import shop_analytics
+from .cache import ResponseCacheMixin
+from .conditional import ConditionalGetMixin, ProductConditionalGetMixin
+from .facets import product_facets
+from .exporter import EXPORT_FORMATS, export_products
+from .filters import filter_orders, filter_products
+from .fulfillment import bulk_change_status
+from .importer import IMPORT_FORMATS, import_products
+from .checkout import checkout
+from .discounts import expiry_metrics
+from .events import FEED_LIMIT, event_data, order_feed
+from .holds import place_holds, release_holds
+from .intake import submit_order
+from .pricing import apply_bulk_discount, clear_bulk_discount
+from .search import suggest
+from .models import Shop, Product, ProductImage, OrderProduct, ProductCategory, ProductProperty, StockHold, OrderIntake
 from .serializers import ShopSerializer, ProductSerializer, ProductImageSerializer, OrderSerializer, \
-    ProductCategorySerializer, ProductPropertySerializer
+    ProductCategorySerializer, ProductPropertySerializer, BulkPriceSerializer, CheckoutSerializer, \
+    StockHoldRequestSerializer, StockHoldSerializer, OrderIntakeSerializer, \
+    OrderBulkStatusSerializer, ShopAnalyticsQuerySerializer
 
 
 # category
-class ProductCategoryListView(generics.ListAPIView):
+class ProductCategoryListView(ResponseCacheMixin, ConditionalGetMixin, StreamingListMixin, generics.ListAPIView):
     queryset = ProductCategory.objects.all()
     serializer_class = ProductCategorySerializer
+    cache_collection = 'categories'
+    cache_tag_fields = {'productcategory': 'id'}
     permission_classes = [AllowAny]
 class ProductCategoryCreateView(generics.CreateAPIView):
     queryset = ProductCategory.objects.all()
@@ -23,9 +50,11 @@ class ProductCategoryEditorView(generics.RetrieveUpdateDestroyAPIView):
     permission_classes = [IsAuthenticated]
     authentication_classes = [JWTAuthentication]
 # property
-class ProductPropertyListView(generics.ListAPIView):
+class ProductPropertyListView(ResponseCacheMixin, ConditionalGetMixin, StreamingListMixin, generics.ListAPIView):
     queryset = ProductProperty.objects.all()
     serializer_class = ProductPropertySerializer
+    cache_collection = 'properties'
+    cache_tag_fields = {'productproperty': 'id'}
     permission_classes = [AllowAny]
 class ProductPropertyCreateView(generics.CreateAPIView):
     queryset = ProductProperty.objects.all()
@@ -38,13 +67,16 @@ class ProductPropertyEditorView(generics.RetrieveUpdateDestroyAPIView):
     permission_classes = [IsAuthenticated]
     authentication_classes = [JWTAuthentication]
 # Shop Views
-class ShopListView(generics.ListAPIView):
+class ShopListView(ResponseCacheMixin, ConditionalGetMixin, StreamingListMixin, generics.ListAPIView):
     queryset = Shop.objects.all()
     permission_classes = [AllowAny]
     serializer_class = ShopSerializer
+    cache_collection = 'shops'
+    cache_tag_fields = {'shop': 'id'}
+    pagination_class = ShopPagination
     # authentication_classes=[JWTAuthentication]
 
-class ShopListAndCreateView(generics.ListCreateAPIView):
+class ShopListAndCreateView(StreamingListMixin, generics.ListCreateAPIView):
     queryset = Shop.objects.all()
     permission_classes = [IsAuthenticated]
     authentication_classes = [JWTAuthentication]
@@ -53,19 +85,37 @@ class ShopListAndCreateView(generics.ListCreateAPIView):
     def get_queryset(self):
         return Shop.objects.filter(shop_account=self.request.user)
 
-class ShopEditorView(generics.RetrieveUpdateDestroyAPIView):
+class ShopEditorView(ConditionalGetMixin, generics.RetrieveUpdateDestroyAPIView):
     queryset = Shop.objects.all()
     permission_classes = [IsAuthenticated]
     authentication_classes = [JWTAuthentication]
     serializer_class = ShopSerializer
 
+class ShopAnalyticsView(APIView):
+    """Revenue series, top products, status funnel and average order value of the user's shop"""
+    permission_classes = [IsAuthenticated]
+    authentication_classes = [JWTAuthentication]
+
+    def get(self, request):
+        shop = get_object_or_404(Shop, shop_account=request.user)
+        serializer = ShopAnalyticsQuerySerializer(data=request.query_params)
+        serializer.is_valid(raise_exception=True)
+        return Response(shop_analytics(shop, **serializer.validated_data))
+
 # Product Views
-class ProductListView(generics.ListAPIView):
-    queryset = Product.objects.all()
+class ProductListView(ResponseCacheMixin, ProductConditionalGetMixin, StreamingListMixin, generics.ListAPIView):
+    queryset = Product.objects.for_listing().with_effective_price()
     permission_classes = [AllowAny]
     serializer_class = ProductSerializer
+    cache_collection = 'products'
+    cache_tag_fields = {'product': 'id', 'shop': 'shop_id', 'productcategory': 'category'}
+    cache_expiry_field = 'discount_end_at'
+    pagination_class = ProductPagination
+
+    def get_queryset(self):
+        return filter_products(super().get_queryset(), self.request.query_params)
 
-class ProductListAndCreateView(generics.ListCreateAPIView):
+class ProductListAndCreateView(StreamingListMixin, generics.ListCreateAPIView):
     queryset = Product.objects.all()
     permission_classes = [IsAuthenticated]
     authentication_classes = [JWTAuthentication]  # ✅ Added authentication
@@ -74,45 +124,127 @@ class ProductListAndCreateView(generics.ListCreateAPIView):
     def get_queryset(self):
         # ✅ FIXED: Get all shops owned by the user, then filter products by those shops
         user_shops = Shop.objects.filter(shop_account=self.request.user)
-        return Product.objects.filter(shop_id__in=user_shops)
+        return Product.objects.for_listing().filter(shop_id__in=user_shops)
 
-class ProductEditorView(generics.RetrieveUpdateDestroyAPIView):
-    queryset = Product.objects.all()
+class ProductEditorView(ProductConditionalGetMixin, generics.RetrieveUpdateDestroyAPIView):
+    queryset = Product.objects.for_listing()
     permission_classes = [IsAuthenticated]
     authentication_classes = [JWTAuthentication]
     serializer_class = ProductSerializer
 
-class ProductSearchView(generics.ListAPIView):
+class ProductSearchView(ResponseCacheMixin, StreamingListMixin, generics.ListAPIView):
     permission_classes = [AllowAny]
     serializer_class = ProductSerializer
+    pagination_class = ProductSearchPagination
+    cache_collection = 'products'
+    cache_tag_fields = {'product': 'id', 'shop': 'shop_id', 'productcategory': 'category'}
+    cache_expiry_field = 'discount_end_at'
     # authentication_classes = [JWTAuthentication]
 
     def get_queryset(self):
         keyword = self.request.GET.get('keyword', '').strip()
         if not keyword:
             return Product.objects.none()
+        return filter_products(Product.objects.for_listing().with_effective_price(), self.request.GET)
+
+class ProductFacetView(APIView):
+    """Product counts per filter value, for the same filters as the product list"""
+    permission_classes = [AllowAny]
+
+    def get(self, request):
+        return Response(product_facets(filter_products(Product.objects.all(), request.query_params)))
+
+class ProductSuggestionView(APIView):
+    """Lightweight autocomplete for the storefront search box"""
+    permission_classes = [AllowAny]
+    max_limit = 20
+
+    def get(self, request):
+        fragment = request.GET.get('q', '').strip()
+        try:
+            limit = min(max(int(request.GET.get('limit', 8)), 1), self.max_limit)
+        except ValueError:
+            limit = 8
+        if len(fragment) < 2:
+            return Response({'products': [], 'shops': [], 'categories': []})
+        return Response(suggest(fragment, limit))
+
+class ProductImportView(APIView):
+    """
+    Bulk-create products in the user's shop from an uploaded CSV or NDJSON
+    file. Invalid rows are reported back and skipped.
+    """
+    permission_classes = [IsAuthenticated]
+    authentication_classes = [JWTAuthentication]
+    parser_classes = [MultiPartParser]
+
+    def post(self, request):
+        shop = get_object_or_404(Shop, shop_account=request.user)
+        upload = request.FILES.get('file')
+        if upload is None:
+            return Response({'file': ['This field is required.']}, status=status.HTTP_400_BAD_REQUEST)
+        fmt = request.data.get('format') or upload.name.rsplit('.', 1)[-1].lower()
+        if fmt not in IMPORT_FORMATS:
+            return Response({'format': [f"Must be one of: {', '.join(IMPORT_FORMATS)}."]}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(import_products(shop, upload, fmt))
+
+class ProductExportView(APIView):
+    """Stream the user's whole catalog as CSV or NDJSON (?format=csv|ndjson)"""
+    permission_classes = [IsAuthenticated]
+    authentication_classes = [JWTAuthentication]
+    content_types = {'csv': 'text/csv', 'ndjson': 'application/x-ndjson'}
+
+    def get(self, request):
+        shop = get_object_or_404(Shop, shop_account=request.user)
+        # "format" is reserved for DRF's renderer selection
+        fmt = request.query_params.get('export_format', 'csv')
+        if fmt not in EXPORT_FORMATS:
+            return Response({'export_format': [f"Must be one of: {', '.join(EXPORT_FORMATS)}."]}, status=status.HTTP_400_BAD_REQUEST)
+
+        media_storage = ProductImage._meta.get_field('media').storage
+        lines = export_products(shop, fmt, lambda name: request.build_absolute_uri(media_storage.url(name)))
+        response = streaming_response(lines, request, content_type=self.content_types[fmt])
+        response['Content-Disposition'] = f'attachment; filename="{shop.pk}-products.{fmt}"'
+        return response
+
+class ProductBulkPriceView(APIView):
+    """
+    Start or end a discount on many of the user's products with one UPDATE.
+    With dry_run the matching products are only counted.
+    """
+    permission_classes = [IsAuthenticated]
+    authentication_classes = [JWTAuthentication]
+
+    def post(self, request):
+        serializer = BulkPriceSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        data = serializer.validated_data
+
+        filters = QueryDict(mutable=True)
+        for key, value in data['filters'].items():
+            filters.setlist(key, value if isinstance(value, list) else [str(value)])
+        queryset = filter_products(Product.objects.filter(shop_id__shop_account=request.user), filters)
+        if 'products' in data:
+            queryset = queryset.filter(pk__in=data['products'])
+
+        if data['dry_run']:
+            return Response({'matched': queryset.count(), 'updated': 0, 'dry_run': True})
+        if data['action'] == BulkPriceSerializer.CLEAR:
+            updated = clear_bulk_discount(queryset)
+        else:
+            updated = apply_bulk_discount(queryset, data['percent_off'], data['discount_end_at'])
+        return Response({'matched': updated, 'updated': updated, 'dry_run': False})
+
+class DiscountExpiryMetricsView(APIView):
+    """Last run of the discount expiry task and how late it expired discounts"""
+    permission_classes = [IsAdminUser]
+    authentication_classes = [JWTAuthentication]
 
-        keywords = keyword.split()
-        query = Q()
-        for word in keywords:
-            query &= (
-                Q(name__icontains=word) |
-                Q(category__icontains=word) |
-                Q(shop_id__name__icontains=word) |
-                Q(color__icontains=word) |
-                Q(dimension__icontains=word) |
-                Q(other__icontains=word) |
-                Q(weight__icontains=word) |
-                Q(price__icontains=word) |
-                Q(new_price__icontains=word) |
-                Q(currency_unit__icontains=word) |
-                Q(description__icontains=word)
-            )
-
-        return Product.objects.filter(query).order_by('-name')
+    def get(self, request):
+        return Response(expiry_metrics())
 
 # ProductImageView
-class ProductImageListView(generics.ListAPIView):
+class ProductImageListView(StreamingListMixin, generics.ListAPIView):
     queryset = ProductImage.objects.all()  # ✅ FIXED: Use ProductImage, not Product
     permission_classes = [IsAuthenticatedOrReadOnly]
     serializer_class = ProductImageSerializer
@@ -130,13 +262,50 @@ class ProductImageEditorView(generics.RetrieveUpdateDestroyAPIView):
     authentication_classes = [JWTAuthentication]
 
 #OrderView
-class OrderListView(generics.ListAPIView):
+class OrderListView(StreamingListMixin, generics.ListAPIView):
     # queryset = OrderProduct.objects.all()
     permission_classes = [IsAuthenticatedOrReadOnly]
     serializer_class = OrderSerializer
     authentication_classes = [JWTAuthentication]
+    pagination_class = OrderPagination
     def get_queryset(self):
-        return OrderProduct.objects.filter(shop__shop_account=self.request.user)
+        queryset = OrderProduct.objects.for_listing().filter(shop__shop_account=self.request.user)
+        return filter_orders(queryset, self.request.query_params)
+
+class OrderBulkStatusView(APIView):
+    """Move many of the shop's orders to one status, with a result per order"""
+    permission_classes = [IsAuthenticated]
+    authentication_classes = [JWTAuthentication]
+
+    def post(self, request):
+        serializer = OrderBulkStatusSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        data = serializer.validated_data
+        results = bulk_change_status(
+            OrderProduct.objects.filter(shop__shop_account=request.user), data['orders'], data['order_status'],
+        )
+        return Response({'updated': sum(result['ok'] for result in results), 'results': results})
+
+class OrderEventFeedView(APIView):
+    """
+    Changes to the shop's orders after the event id ?after=, in commit order;
+    pass the returned "next" as ?after= to read on.
+    """
+    permission_classes = [IsAuthenticated]
+    authentication_classes = [JWTAuthentication]
+
+    def get(self, request):
+        shop = get_object_or_404(Shop, shop_account=request.user)
+        try:
+            after = int(request.query_params.get('after', 0))
+            limit = int(request.query_params.get('limit', FEED_LIMIT))
+        except ValueError:
+            raise ValidationError('after and limit must be integers.')
+        events = order_feed(shop, after, limit)
+        return Response({
+            'next': events[-1].id if events else after,
+            'events': [event_data(event) for event in events],
+        })
 
 class OrderCreateView(generics.CreateAPIView):
     permission_classes = [IsAuthenticated]
@@ -150,4 +319,84 @@ class OrderEditorView(generics.RetrieveUpdateDestroyAPIView):
     serializer_class = OrderSerializer
     authentication_classes = [JWTAuthentication]
     def get_queryset(self):
-        return OrderProduct.objects.filter(customer=self.request.user)
\ No newline at end of file
+        return OrderProduct.objects.for_listing().filter(customer=self.request.user)
+
+def get_customer(request):
+    customer = getattr(request.user, 'guest_user', None)
+    if customer is None:
+        raise ValidationError('Only customers can check out.')
+    return customer
+
+class StockHoldView(APIView):
+    """
+    Reserve the items of a cart for a few minutes while the customer checks
+    out (POST), list the active holds (GET) or release them (DELETE,
+    optionally ?product=id).
+    """
+    permission_classes = [IsAuthenticated]
+    authentication_classes = [JWTAuthentication]
+
+    def get(self, request):
+        holds = StockHold.objects.active().filter(customer=get_customer(request))
+        return Response(StockHoldSerializer(holds, many=True).data)
+
+    def post(self, request):
+        customer = get_customer(request)
+        serializer = StockHoldRequestSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        items = [(item['product'], item['quantity']) for item in serializer.validated_data['items']]
+        try:
+            holds = place_holds(customer, items)
+        except DjangoValidationError as e:
+            raise ValidationError(e.messages)
+        return Response(StockHoldSerializer(holds, many=True).data, status=status.HTTP_201_CREATED)
+
+    def delete(self, request):
+        release_holds(get_customer(request), request.query_params.getlist('product'))
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+class CheckoutView(APIView):
+    """Order every item of a cart in one request and one transaction"""
+    permission_classes = [IsAuthenticated]
+    authentication_classes = [JWTAuthentication]
+
+    def post(self, request):
+        customer = get_customer(request)
+        serializer = CheckoutSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        data = serializer.validated_data
+
+        items = [(item['product'], item['quantity']) for item in data['items']]
+        try:
+            lines = checkout(customer, items, note=data.get('note'))
+        except DjangoValidationError as e:
+            raise ValidationError(e.messages)
+        return Response({
+            'order_number': lines[0].order_number,
+            'orders': OrderSerializer(lines, many=True).data,
+        }, status=status.HTTP_201_CREATED)
+
+class OrderIntakeView(APIView):
+    """
+    Queue an order for a busy product and answer at once with a token; the
+    result is polled at shops/order-intake/<token>/ or pushed over the
+    ws/order-intake/<token>/ websocket.
+    """
+    permission_classes = [IsAuthenticated]
+    authentication_classes = [JWTAuthentication]
+
+    def post(self, request):
+        customer = get_customer(request)
+        serializer = OrderIntakeSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        data = serializer.validated_data
+        intake = submit_order(customer, data['product'], data['quantity'], note=data.get('note'))
+        return Response(OrderIntakeSerializer(intake).data, status=status.HTTP_202_ACCEPTED)
+
+class OrderIntakeDetailView(generics.RetrieveAPIView):
+    permission_classes = [IsAuthenticated]
+    authentication_classes = [JWTAuthentication]
+    serializer_class = OrderIntakeSerializer
+
+    def get_queryset(self):
+        return OrderIntake.objects.filter(customer__user=self.request.user)